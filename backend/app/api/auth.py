@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
+from app.core.pagination import decode_position, encode_position
 from app.core.auth import (
-    authenticate_user, create_user_tokens, get_password_hash, 
+    authenticate_user, create_user_tokens, get_password_hash_async, verify_password_async,
     verify_token, refresh_access_token, revoke_refresh_token,
-    get_user_by_username
+    get_user_by_username, get_authenticated_user
+)
+from app.models.database import User, friendship_table
+from app.services.feed_cache import feed_cache
+from app.services.hashing import password_hash_pool
+from app.services.sessions import end_session, end_sessions
+from app.services.snapshots import sample_snapshot
+from app.services.user_cache import user_cache
+from app.services.versions import (
+    PROFILES, bump_version, etag_headers, etag_matches, make_etag, not_modified
 )
-from app.models.database import User
 from app.models.schemas import (
-    UserCreate, UserResponse, LoginRequest, Token, APIResponse, UserUpdate
+    UserCreate, UserResponse, LoginRequest, Token, APIResponse, UserUpdate, PasswordChange
 )
 from typing import List, Optional
 
@@ -17,6 +28,9 @@ router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
 optional_security = HTTPBearer(auto_error=False)
 
+# Users read per query while streaming the directory export
+EXPORT_BATCH_SIZE = 500
+
 @router.post("/register", response_model=APIResponse)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
@@ -35,7 +49,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -61,7 +75,7 @@ async def login(
 ):
     """Login user and return tokens"""
     
-    user = authenticate_user(db, login_data.username, login_data.password)
+    user = await authenticate_user(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -114,13 +128,22 @@ async def refresh_token(request: Request, db: Session = Depends(get_db)):
 async def logout(
     response: Response,
     request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     db: Session = Depends(get_db)
 ):
-    """Logout user and revoke refresh token"""
+    """Logout user, revoking the refresh token and the access tokens of this session only"""
     
     refresh_token = request.cookies.get("refresh_token")
     if refresh_token:
         revoke_refresh_token(db, refresh_token)
+    elif credentials:
+        token_data = verify_token(credentials.credentials)
+        user = get_authenticated_user(db, token_data) if token_data else None
+        if user and token_data.session_id is not None:
+            end_session(db, token_data.session_id, user.id)
+        elif user:
+            # Issued before tokens named their session; these expire within access_token_expire_minutes
+            end_sessions(db, user.id)
     
     # Clear refresh token cookie
     response.delete_cookie(key="refresh_token")
@@ -132,6 +155,8 @@ async def logout(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
+    request: Request,
+    response: Response,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -145,24 +170,125 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_user_by_username(db, token_data.username)
+    user = get_authenticated_user(db, token_data)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
+    etag = make_etag("me", user.id, user.updated_at)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+    
+    return user
+
+def _directory_query(
+    db: Session,
+    online: bool = False,
+    friends_of: Optional[User] = None,
+    q: Optional[str] = None
+):
+    """Users matching the directory filters, ordered by id"""
+    users_query = db.query(User)
+    if online:
+        users_query = users_query.filter(User.is_online.is_(True))
+    if friends_of is not None:
+        friend_ids = select(friendship_table.c.friend_id).where(friendship_table.c.user_id == friends_of.id)
+        users_query = users_query.filter(User.id.in_(friend_ids))
+    if q:
+        prefix = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        users_query = users_query.filter(
+            User.username.like(prefix, escape="\\") | User.full_name.like(prefix, escape="\\")
+        )
+    return users_query.order_by(User.id)
+
+def _directory_viewer(db: Session, credentials: Optional[HTTPAuthorizationCredentials]) -> User:
+    """The authenticated caller, required by the friends filter and the export"""
+    token_data = verify_token(credentials.credentials) if credentials else None
+    user = get_authenticated_user(db, token_data) if token_data else None
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 @router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    per_page: int = Query(50, ge=1, le=200),
+    online: bool = Query(False, description="Only users who are online"),
+    friends: bool = Query(False, description="Only the caller's friends; requires authentication"),
+    q: Optional[str] = Query(None, max_length=100, description="Username or full name prefix"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
     db: Session = Depends(get_db)
 ):
-    """Get all users"""
+    """
+    Get one page of the user directory.
+    
+    Pass the X-Next-Cursor header back as `cursor` for the next page. Use
+    /users/export to download every matching user at once.
+    """
     
-    users = db.query(User).all()
+    friends_of = _directory_viewer(db, credentials) if friends else None
+    users_query = _directory_query(db, online=online, friends_of=friends_of, q=q)
+    if cursor:
+        try:
+            (after_id,) = decode_position(cursor)
+            users_query = users_query.filter(User.id > int(after_id))
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    users = users_query.limit(per_page + 1).all()
+    if len(users) > per_page:
+        users = users[:per_page]
+        response.headers["X-Next-Cursor"] = encode_position([users[-1].id])
     return users
 
+@router.get("/users/export")
+async def export_users(
+    online: bool = Query(False),
+    friends: bool = Query(False),
+    q: Optional[str] = Query(None, max_length=100),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream every matching user as newline-delimited JSON.
+    
+    Users are read and serialized one batch at a time on a dedicated
+    session, so memory stays flat however many users match.
+    """
+    
+    viewer = _directory_viewer(db, credentials)
+    friends_of_id = viewer.id if friends else None
+    
+    def generate_lines():
+        export_db = SessionLocal()
+        try:
+            friends_of = export_db.get(User, friends_of_id) if friends_of_id else None
+            users_query = _directory_query(export_db, online=online, friends_of=friends_of, q=q)
+            after_id = 0
+            while True:
+                users = users_query.filter(User.id > after_id).limit(EXPORT_BATCH_SIZE).all()
+                for user in users:
+                    yield UserResponse.model_validate(user).model_dump_json() + "\n"
+                if len(users) < EXPORT_BATCH_SIZE:
+                    return
+                after_id = users[-1].id
+                export_db.expunge_all()
+        finally:
+            export_db.close()
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
 @router.put("/me", response_model=UserResponse)
 async def update_profile(
     user_update: UserUpdate,
@@ -181,7 +307,7 @@ async def update_profile(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    current_user = get_user_by_username(db, token_data.username)
+    current_user = get_authenticated_user(db, token_data)
     if not current_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,11 +322,59 @@ async def update_profile(
     
     current_user.updated_at = datetime.utcnow()
     
+    # Profiles are embedded in feeds, chats and stories
+    bump_version(db, PROFILES)
     db.commit()
+    user_cache.invalidate(current_user.id)
+    # Cached pages are keyed by the old version and can no longer be served
+    feed_cache.clear()
+    sample_snapshot.invalidate()
     db.refresh(current_user)
     
     return current_user
 
+@router.put("/me/password", response_model=Token)
+async def change_password(
+    response: Response,
+    password_change: PasswordChange,
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Change the current user's password, signing out every other session"""
+    
+    token_data = verify_token(credentials.credentials)
+    current_user = get_authenticated_user(db, token_data) if token_data else None
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # The cached snapshot may predate a password change made elsewhere
+    db.refresh(current_user)
+    if not await verify_password_async(password_change.current_password, current_user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Current password is incorrect"
+        )
+    
+    current_user.hashed_password = await get_password_hash_async(password_change.new_password)
+    # Revokes all access and refresh tokens, then signs this session back in
+    end_sessions(db, current_user.id, revoke_refresh_tokens=True)
+    tokens = create_user_tokens(db, current_user)
+    
+    response.set_cookie(
+        key="refresh_token",
+        value=tokens["refresh_token"],
+        httponly=True,
+        secure=False,  # Set to True in production with HTTPS
+        samesite="lax",
+        max_age=7 * 24 * 60 * 60  # 7 days
+    )
+    
+    return Token(**tokens)
+
 # Dependency to get current user
 async def get_current_user_dependency(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -216,7 +390,7 @@ async def get_current_user_dependency(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_user_by_username(db, token_data.username)
+    user = get_authenticated_user(db, token_data)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -240,7 +414,12 @@ async def get_current_user_optional(
         if not token_data:
             return None
         
-        user = get_user_by_username(db, token_data.username)
+        user = get_authenticated_user(db, token_data)
         return user
     except:
         return None
+
+@router.get("/hashing/stats", response_model=dict)
+async def get_password_hashing_stats(current_user: User = Depends(get_current_user_dependency)):
+    """Get password hashing pool concurrency, queue depth and load shedding statistics"""
+    return password_hash_pool.stats()
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.database import Post, User
+from app.models.schemas import BatchRequest, BatchResponse, BatchOperation, BatchOperationResult
+from app.api.auth import get_current_user_dependency
+from app.services.chats import mark_chat_read
+from app.services.reactions import REACTION_TYPES, toggle_like, toggle_post_reaction
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+@router.post("", response_model=BatchResponse)
+async def apply_batch(
+    batch: BatchRequest,
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply an ordered list of reactions, likes and read receipts in one transaction.
+    
+    Operations run in order, and each gets its own result. An operation that
+    targets a missing post or user is reported as 404 and skipped; the rest
+    are committed together.
+    """
+    
+    if len(batch.operations) > settings.batch_max_operations:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.batch_max_operations} operations per batch"
+        )
+    
+    # Resolve every referenced post and user up front with one query each
+    post_ids = {operation.post_id for operation in batch.operations if operation.post_id is not None}
+    user_ids = {operation.user_id for operation in batch.operations if operation.user_id is not None}
+    existing_posts = {
+        post_id for (post_id,) in db.query(Post.id).filter(Post.id.in_(post_ids))
+    } if post_ids else set()
+    existing_users = {
+        user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))
+    } if user_ids else set()
+    
+    results = []
+    for index, operation in enumerate(batch.operations):
+        results.append(
+            _apply_operation(db, index, operation, current_user, existing_posts, existing_users)
+        )
+    
+    db.commit()
+    
+    return BatchResponse(results=results)
+
+def _apply_operation(
+    db: Session,
+    index: int,
+    operation: BatchOperation,
+    current_user: User,
+    existing_posts: set,
+    existing_users: set
+) -> BatchOperationResult:
+    """Apply one batch operation inside the batch transaction"""
+    
+    def failed(status_code: int, detail: str) -> BatchOperationResult:
+        return BatchOperationResult(
+            index=index, op=operation.op, success=False, status_code=status_code, detail=detail
+        )
+    
+    if operation.op == "mark_read":
+        if operation.user_id is None:
+            return failed(status.HTTP_422_UNPROCESSABLE_ENTITY, "user_id is required")
+        if operation.user_id not in existing_users:
+            return failed(status.HTTP_404_NOT_FOUND, "User not found")
+        marked = mark_chat_read(db, current_user.id, operation.user_id)
+        data = {"marked": marked}
+    else:
+        if operation.post_id is None:
+            return failed(status.HTTP_422_UNPROCESSABLE_ENTITY, "post_id is required")
+        if operation.post_id not in existing_posts:
+            return failed(status.HTTP_404_NOT_FOUND, "Post not found")
+        if operation.op == "like":
+            state = toggle_like(db, operation.post_id, current_user.id)
+            data = {"is_liked": state.reaction is not None, "reaction": state.reaction}
+        else:
+            reaction_type = (operation.reaction_type or "").strip() or None
+            if reaction_type is not None and reaction_type not in REACTION_TYPES:
+                return failed(status.HTTP_422_UNPROCESSABLE_ENTITY, "Unknown reaction type")
+            state = toggle_post_reaction(db, operation.post_id, current_user.id, reaction_type)
+            data = {"reaction": state.reaction}
+        data.update(likes_count=state.likes_count, reaction_counts=state.reaction_counts)
+    
+    return BatchOperationResult(
+        index=index, op=operation.op, success=True, status_code=status.HTTP_200_OK, data=data
+    )
@@ -1,48 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, or_, and_
+from sqlalchemy import case, func, or_, and_
 from typing import List
 from app.core.database import get_db
 from app.models.database import Message, User
 from app.models.schemas import MessageCreate, MessageResponse, ChatResponse, APIResponse
 from app.api.auth import get_current_user_dependency
+from app.services.chats import mark_chat_read
+from app.services.loaders import attach, message_loader, user_loader
+from app.services.versions import (
+    PROFILES, bump_version, chats_resource, etag_headers, etag_matches, get_versions, make_etag, not_modified
+)
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
 @router.get("/chats", response_model=List[ChatResponse])
 async def get_chats(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user_dependency),
     db: Session = Depends(get_db)
 ):
     """Get user's chat list with last message and unread count"""
     
-    # Get all users that have exchanged messages with current user
-    chat_users_query = db.query(User).join(
-        Message, 
-        or_(
-            and_(Message.sender_id == User.id, Message.receiver_id == current_user.id),
-            and_(Message.receiver_id == User.id, Message.sender_id == current_user.id)
-        )
-    ).filter(User.id != current_user.id).distinct()
+    # Latest message id per chat partner, in one grouped query
+    partner_id = case(
+        (Message.sender_id == current_user.id, Message.receiver_id),
+        else_=Message.sender_id
+    )
+    last_message_ids = dict(db.query(partner_id, func.max(Message.id)).filter(
+        or_(Message.sender_id == current_user.id, Message.receiver_id == current_user.id),
+        partner_id != current_user.id
+    ).group_by(partner_id).all())
+    
+    # Partners' presence is shown but not versioned, so it goes into the token as is
+    presence = db.query(User.id, User.is_online, User.last_seen).filter(
+        User.id.in_(last_message_ids)
+    ).order_by(User.id).all()
+    etag = make_etag(
+        "chats", get_versions(db, chats_resource(current_user.id), PROFILES),
+        [tuple(row) for row in presence]
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
     
-    chat_users = chat_users_query.all()
+    # Unread messages from each partner to current user
+    unread_counts = dict(db.query(Message.sender_id, func.count(Message.id)).filter(
+        Message.receiver_id == current_user.id,
+        Message.is_read == False
+    ).group_by(Message.sender_id).all())
+    
+    # Partners, last messages and their participants with one IN query each
+    users = user_loader(db)
+    users.prime(current_user.id, current_user)
+    chat_users = [user for user in users.load_many(last_message_ids) if user is not None]
+    last_messages = message_loader(db).load_many(last_message_ids.values())
+    attach(last_messages, "sender", "sender_id", users)
+    attach(last_messages, "receiver", "receiver_id", users)
+    last_message_by_partner = dict(zip(last_message_ids, last_messages))
     
     chats = []
     for user in chat_users:
-        # Get last message between current user and this user
-        last_message = db.query(Message).filter(
-            or_(
-                and_(Message.sender_id == current_user.id, Message.receiver_id == user.id),
-                and_(Message.sender_id == user.id, Message.receiver_id == current_user.id)
-            )
-        ).order_by(desc(Message.created_at)).first()
-        
-        # Count unread messages from this user to current user
-        unread_count = db.query(Message).filter(
-            Message.sender_id == user.id,
-            Message.receiver_id == current_user.id,
-            Message.is_read == False
-        ).count()
+        last_message = last_message_by_partner[user.id]
+        unread_count = unread_counts.get(user.id, 0)
         
         last_message_response = None
         if last_message:
@@ -71,6 +92,8 @@ async def get_chats(
 @router.get("/{other_user_id}", response_model=List[MessageResponse])
 async def get_messages_with_user(
     other_user_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user_dependency),
     db: Session = Depends(get_db)
 ):
@@ -84,6 +107,14 @@ async def get_messages_with_user(
             detail="User not found"
         )
     
+    etag = make_etag(
+        "messages", other_user_id, get_versions(db, chats_resource(current_user.id), PROFILES),
+        other_user.is_online, other_user.last_seen
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+    
     # Get messages between the two users
     messages = db.query(Message).options(
         joinedload(Message.sender),
@@ -131,6 +162,7 @@ async def send_message(
     )
     
     db.add(db_message)
+    bump_version(db, chats_resource(current_user.id), chats_resource(receiver_id))
     db.commit()
     db.refresh(db_message)
     
@@ -168,18 +200,10 @@ async def mark_messages_as_read(
         )
     
     # Mark all unread messages from other user as read
-    unread_messages = db.query(Message).filter(
-        Message.sender_id == other_user_id,
-        Message.receiver_id == current_user.id,
-        Message.is_read == False
-    ).all()
-    
-    for message in unread_messages:
-        message.is_read = True
-    
+    marked = mark_chat_read(db, current_user.id, other_user_id)
     db.commit()
     
     return APIResponse(
         success=True,
-        message=f"Marked {len(unread_messages)} messages as read"
+        message=f"Marked {marked} messages as read"
     )
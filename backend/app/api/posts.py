@@ -1,167 +1,250 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, func
-from typing import List, Optional
+from sqlalchemy import desc
+from typing import List, Optional, Tuple
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.pagination import decode_position, encode_cursor, encode_position, paginate_keyset
 from app.models.database import Post, User, Comment, PostReaction
 from app.models.schemas import (
     PostCreate, PostUpdate, PostResponse, APIResponse, PaginatedResponse,
-    CommentCreate, CommentResponse, ReactionCreate, ReactionResponse, CommentUpdate
+    CommentCreate, CommentResponse, CommentPage, CommentThreadResponse, ReactionCreate, CommentUpdate,
+    PostChanges, ReactionPage
 )
 from app.api.auth import get_current_user_dependency, get_current_user_optional
+from app.services.changes import get_changes_since
+from app.services.comments import get_comment_thread
+from app.services.counters import adjust_post_counters, adjust_comment_counters
+from app.services.events import (
+    record_event, POST_CREATED, POST_UPDATED, POST_DELETED,
+    COMMENT_CREATED, COMMENT_UPDATED, COMMENT_DELETED
+)
+from app.services.feed import build_post_responses, build_comment_response, overlay_viewer_state
+from app.services.feed_cache import CachedPage, feed_cache
+from app.services.loaders import attach, post_loader, user_loader
+from app.services.ranking import rank_posts, ranked_snapshots
+from app.services.reactions import REACTION_TYPES, toggle_like, toggle_post_reaction
+from app.services.snapshots import sample_snapshot
+from app.services.versions import (
+    PROFILES, etag_headers, etag_matches, feed_etag, get_versions, not_modified
+)
+from app.services.timeline import fan_out_post, get_home_timeline, remove_post_from_timelines
+from app.services.worker import background_worker
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
+# Relationships serialized on feed pages
+FEED_DETAIL_OPTIONS = (
+    joinedload(Post.author),
+)
+
 @router.get("/sample", response_model=List[PostResponse])
 async def get_sample_posts(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Get sample posts with optional authentication"""
     
-    # Get all posts with author information, ordered by creation date
-    posts_query = db.query(Post).options(
-        joinedload(Post.author),
-        joinedload(Post.liked_by),
-        joinedload(Post.comments).joinedload(Comment.author),
-        joinedload(Post.reactions).joinedload(PostReaction.user)
-    ).order_by(desc(Post.created_at))
-    
-    posts = posts_query.limit(10).all()
-    
-    # Format posts with additional information
-    formatted_posts = []
-    for post in posts:
-        # Count likes and comments
-        likes_count = len(post.liked_by)
-        comments_count = len(post.comments)
-        
-        # Find current user's reaction if authenticated
-        current_user_reaction = None
-        if current_user:
-            for reaction in post.reactions:
-                if reaction.user_id == current_user.id:
-                    current_user_reaction = reaction.reaction_type
-                    break
-        
-        post_response = PostResponse(
-            id=post.id,
-            content=post.content,
-            image_url=post.image_url,
-            author_id=post.author_id,
-            author=post.author,
-            created_at=post.created_at,
-            updated_at=post.updated_at,
-            likes_count=likes_count,
-            comments_count=comments_count,
-            shares_count=0,
-            is_liked=False,  # Legacy field
-            current_user_reaction=current_user_reaction,
-            reactions=[
-                ReactionResponse(
-                    id=reaction.id,
-                    user_id=reaction.user_id,
-                    post_id=reaction.post_id,
-                    reaction_type=reaction.reaction_type,
-                    user=reaction.user,
-                    created_at=reaction.created_at
-                ) for reaction in post.reactions
-            ],
-            comments=[
-                CommentResponse(
-                    id=comment.id,
-                    content=comment.content,
-                    post_id=comment.post_id,
-                    author_id=comment.author_id,
-                    author=comment.author,
-                    created_at=comment.created_at,
-                    updated_at=comment.updated_at or comment.created_at,
-                    likes_count=0,
-                    is_liked=False
-                ) for comment in post.comments
-            ]
+    if current_user is None:
+        # Anonymous visitors share a pre-rendered snapshot served without touching the database
+        snapshot = sample_snapshot.get()
+        if etag_matches(request, snapshot.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=snapshot.headers(gzipped=False))
+        gzipped = "gzip" in request.headers.get("accept-encoding", "")
+        return Response(
+            content=snapshot.gzipped if gzipped else snapshot.body,
+            media_type="application/json",
+            headers=snapshot.headers(gzipped)
         )
-        
-        formatted_posts.append(post_response)
     
-    return formatted_posts
+    post_ids = [row.id for row in db.query(Post.id).order_by(desc(Post.created_at), desc(Post.id)).limit(10)]
+    profiles_version = get_versions(db, PROFILES)[PROFILES]
+    etag = feed_etag(db, post_ids, profiles_version, "sample", current_user.id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    def build_page() -> CachedPage:
+        posts = _load_posts_in_order(db.query(Post).options(*FEED_DETAIL_OPTIONS), post_ids)
+        return _build_cached_page(db, posts, head=True)
+    
+    return _cached_page_response(db, feed_cache.get_or_build(("sample", profiles_version), build_page), current_user, etag)
+
+@router.get("/cache/stats", response_model=dict)
+async def get_feed_cache_stats(current_user: User = Depends(get_current_user_dependency)):
+    """Get feed cache hit, miss and eviction statistics"""
+    return feed_cache.stats()
+
+@router.get("/changes", response_model=PostChanges)
+async def get_post_changes(
+    since: Optional[str] = Query(None, description="next_token of the previous sync; omit to start syncing"),
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db)
+):
+    """
+    Get posts created, updated or deleted and counters changed since a sync token.
+    
+    Keep `next_token` and send it back as `since`; while `has_more` is set,
+    fetch again straight away. A 410 means the token fell out of the change
+    log and the feed must be refetched.
+    """
+    return get_changes_since(db, since, current_user)
 
 @router.get("/", response_model=List[PostResponse])
 async def get_posts(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    feed: str = Query("all", pattern="^(all|home)$", description="all posts, or the home timeline of followed users"),
+    rank: str = Query("chronological", pattern="^(chronological|engagement)$"),
+    ids: Optional[str] = Query(None, description="Comma-separated post ids to fetch instead of a feed page"),
     current_user: User = Depends(get_current_user_dependency),
     db: Session = Depends(get_db)
 ):
-    """Get paginated posts for newsfeed"""
+    """
+    Get paginated posts for newsfeed.
+    
+    Pass the X-Next-Cursor header of a page back as `cursor` to fetch the
+    next one; `page` is still honoured for clients that do not send a cursor.
+    The chronological home feed is cursor-only and answers `page` past 1 with
+    a 400. Engagement-ranked feeds re-order the newest posts of the feed;
+    their cursors walk the order ranked for the first page and expire with a
+    410 after `ranked_snapshot_ttl_seconds`. With `ids`, the listed
+    posts are returned in the requested order instead, skipping missing ones.
+    """
     
-    offset = (page - 1) * per_page
+    if ids is not None:
+        return _get_posts_by_ids(db, _parse_ids(ids), current_user)
     
     # Get posts with author information, ordered by creation date
-    posts_query = db.query(Post).options(
-        joinedload(Post.author),
-        joinedload(Post.liked_by),
-        joinedload(Post.comments).joinedload(Comment.author),
-        joinedload(Post.reactions).joinedload(PostReaction.user)
-    ).order_by(desc(Post.created_at))
-    
-    posts = posts_query.offset(offset).limit(per_page).all()
-    
-    # Format posts with additional information
-    formatted_posts = []
-    for post in posts:
-        # Count likes and comments
-        likes_count = len(post.liked_by)
-        comments_count = len(post.comments)
-        is_liked = current_user in post.liked_by
+    posts_query = db.query(Post).options(*FEED_DETAIL_OPTIONS)
+    next_cursor = None
+    
+    if rank == "chronological" and feed == "all":
+        # Only the page's ids are read before the ETag check
+        ids_query = db.query(Post.id, Post.created_at)
+        if cursor or page == 1:
+            rows, page_cursor = paginate_keyset(ids_query, Post.created_at, Post.id, cursor=cursor, limit=per_page)
+        else:
+            # Legacy offset paging for clients that have not adopted cursors yet
+            offset = (page - 1) * per_page
+            rows = ids_query.order_by(desc(Post.created_at), desc(Post.id)).offset(offset).limit(per_page).all()
+            page_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if len(rows) == per_page else None
+        post_ids = [row.id for row in rows]
+        profiles_version = get_versions(db, PROFILES)[PROFILES]
+        etag = feed_etag(db, post_ids, profiles_version, current_user.id, str(request.query_params))
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
-        # Get current user's reaction
-        current_user_reaction = None
-        for reaction in post.reactions:
-            if reaction.user_id == current_user.id:
-                current_user_reaction = reaction.reaction_type
-                break
+        # The global feed is the same for every viewer, so its pages are cached
+        def build_page() -> CachedPage:
+            posts = _load_posts_in_order(posts_query, post_ids)
+            # Pages after a cursor are unaffected by newer posts
+            return _build_cached_page(db, posts, next_cursor=page_cursor, head=not cursor)
         
-        post_response = PostResponse(
-            id=post.id,
-            content=post.content,
-            image_url=post.image_url,
-            author_id=post.author_id,
-            author=post.author,
-            created_at=post.created_at,
-            updated_at=post.updated_at,
-            likes_count=likes_count,
-            comments_count=comments_count,
-            shares_count=0,
-            is_liked=is_liked,
-            current_user_reaction=current_user_reaction,
-            reactions=[
-                ReactionResponse(
-                    id=reaction.id,
-                    user_id=reaction.user_id,
-                    post_id=reaction.post_id,
-                    reaction_type=reaction.reaction_type,
-                    user=reaction.user,
-                    created_at=reaction.created_at
-                ) for reaction in post.reactions
-            ],
-            comments=[
-                CommentResponse(
-                    id=comment.id,
-                    content=comment.content,
-                    post_id=comment.post_id,
-                    author_id=comment.author_id,
-                    author=comment.author,
-                    created_at=comment.created_at,
-                    updated_at=comment.updated_at or comment.created_at,
-                    likes_count=0,
-                    is_liked=False
-                ) for comment in post.comments
-            ]
-        )
-        formatted_posts.append(post_response)
+        # Keyed by the profiles version too, so a page never outlives the names in its ETag
+        cache_key = ("all", per_page, cursor, profiles_version) if cursor else ("all", per_page, page, profiles_version)
+        return _cached_page_response(db, feed_cache.get_or_build(cache_key, build_page), current_user, etag)
+    
+    if rank != "chronological":
+        owner = (current_user.id, feed, rank)
+        if cursor:
+            token, offset = _decode_ranked_cursor(cursor)
+            ranked_ids = ranked_snapshots.get(token, owner)
+            if ranked_ids is None:
+                raise HTTPException(
+                    status_code=status.HTTP_410_GONE,
+                    detail="Ranked feed has expired; reload it from the first page"
+                )
+        else:
+            # Candidate retrieval, then a ranking stage over the whole batch
+            if feed == "home":
+                candidate_ids, _ = get_home_timeline(db, current_user.id, limit=settings.ranking_candidate_limit)
+            else:
+                candidate_ids = [row.id for row in db.query(Post.id).order_by(
+                    desc(Post.created_at), desc(Post.id)
+                ).limit(settings.ranking_candidate_limit)]
+            ranked_ids = rank_posts(db, candidate_ids, current_user.id, rank)
+            token = ranked_snapshots.put(owner, ranked_ids)
+            offset = (page - 1) * per_page
+        post_ids = [int(post_id) for post_id in ranked_ids[offset:offset + per_page]]
+        if offset + per_page < len(ranked_ids):
+            next_cursor = encode_position([token, offset + per_page])
+    else:
+        if page > 1 and not cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The home feed is cursor-only; pass the X-Next-Cursor header as cursor instead of page"
+            )
+        post_ids, next_cursor = get_home_timeline(db, current_user.id, cursor=cursor, limit=per_page)
     
-    return formatted_posts
+    etag = feed_etag(db, post_ids, get_versions(db, PROFILES)[PROFILES], current_user.id, str(request.query_params))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    posts = _load_posts_in_order(posts_query, post_ids)
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers.update(etag_headers(etag))
+    
+    return build_post_responses(db, posts, current_user, include_details=True)
+
+def _decode_ranked_cursor(cursor: str) -> Tuple[str, int]:
+    """Split a ranked feed cursor into its snapshot token and offset"""
+    values = decode_position(cursor)
+    if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int) or values[1] < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return values[0], values[1]
+
+def _parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated id list, keeping the first occurrence of each id"""
+    try:
+        post_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated integers"
+        )
+    if len(post_ids) > settings.multiget_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.multiget_max_ids} ids per request"
+        )
+    return post_ids
+
+def _get_posts_by_ids(db: Session, post_ids: List[int], viewer: User) -> List[PostResponse]:
+    """Fetch posts, their authors and the viewer's state with one IN query each"""
+    posts = [post for post in post_loader(db).load_many(post_ids) if post is not None]
+    attach(posts, "author", "author_id", user_loader(db))
+    return build_post_responses(db, posts, viewer)
+
+def _load_posts_in_order(posts_query, post_ids: List[int]) -> List[Post]:
+    """Load posts by id, preserving the order of `post_ids`"""
+    posts_by_id = {post.id: post for post in posts_query.filter(Post.id.in_(post_ids))}
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+
+def _build_cached_page(
+    db: Session,
+    posts: List[Post],
+    next_cursor: Optional[str] = None,
+    head: bool = False
+) -> CachedPage:
+    """Serialize a feed page without viewer state, ready to be shared"""
+    items = [post.model_dump(mode="json") for post in build_post_responses(db, posts, include_details=True)]
+    return CachedPage(items=items, next_cursor=next_cursor, head=head)
+
+def _cached_page_response(db: Session, page: CachedPage, viewer: Optional[User], etag: str) -> JSONResponse:
+    """Respond with a cached page, overlaid with the viewer's own state"""
+    headers = etag_headers(etag)
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    return JSONResponse(content=overlay_viewer_state(db, page.items, viewer), headers=headers)
 
 @router.post("/", response_model=PostResponse)
 async def create_post(
@@ -178,28 +261,14 @@ async def create_post(
     )
     
     db.add(db_post)
+    db.flush()
+    record_event(db, POST_CREATED, db_post.id, user_id=current_user.id)
     db.commit()
     db.refresh(db_post)
     
-    # Load the post with author information
-    post_with_author = db.query(Post).options(
-        joinedload(Post.author),
-        joinedload(Post.liked_by),
-        joinedload(Post.comments)
-    ).filter(Post.id == db_post.id).first()
-    
-    return PostResponse(
-        id=post_with_author.id,
-        content=post_with_author.content,
-        image_url=post_with_author.image_url,
-        author_id=post_with_author.author_id,
-        author=post_with_author.author,
-        created_at=post_with_author.created_at,
-        updated_at=post_with_author.updated_at,
-        likes_count=0,
-        comments_count=0,
-        is_liked=False
-    )
+    background_worker.submit(fan_out_post, db_post.id)
+    
+    return build_post_responses(db, [db_post], current_user)[0]
 
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(
@@ -210,9 +279,7 @@ async def get_post(
     """Get a specific post by ID"""
     
     post = db.query(Post).options(
-        joinedload(Post.author),
-        joinedload(Post.liked_by),
-        joinedload(Post.comments).joinedload(Comment.author)
+        joinedload(Post.author)
     ).filter(Post.id == post_id).first()
     
     if not post:
@@ -221,22 +288,7 @@ async def get_post(
             detail="Post not found"
         )
     
-    likes_count = len(post.liked_by)
-    comments_count = len(post.comments)
-    is_liked = current_user in post.liked_by
-    
-    return PostResponse(
-        id=post.id,
-        content=post.content,
-        image_url=post.image_url,
-        author_id=post.author_id,
-        author=post.author,
-        created_at=post.created_at,
-        updated_at=post.updated_at,
-        likes_count=likes_count,
-        comments_count=comments_count,
-        is_liked=is_liked
-    )
+    return build_post_responses(db, [post], current_user)[0]
 
 @router.put("/{post_id}", response_model=PostResponse)
 async def update_post(
@@ -267,32 +319,11 @@ async def update_post(
     if post_data.image_url is not None:
         post.image_url = post_data.image_url
     
+    record_event(db, POST_UPDATED, post_id, user_id=current_user.id)
     db.commit()
     db.refresh(post)
     
-    # Load updated post with author information
-    updated_post = db.query(Post).options(
-        joinedload(Post.author),
-        joinedload(Post.liked_by),
-        joinedload(Post.comments)
-    ).filter(Post.id == post_id).first()
-    
-    likes_count = len(updated_post.liked_by)
-    comments_count = len(updated_post.comments)
-    is_liked = current_user in updated_post.liked_by
-    
-    return PostResponse(
-        id=updated_post.id,
-        content=updated_post.content,
-        image_url=updated_post.image_url,
-        author_id=updated_post.author_id,
-        author=updated_post.author,
-        created_at=updated_post.created_at,
-        updated_at=updated_post.updated_at,
-        likes_count=likes_count,
-        comments_count=comments_count,
-        is_liked=is_liked
-    )
+    return build_post_responses(db, [post], current_user)[0]
 
 @router.delete("/{post_id}", response_model=APIResponse)
 async def delete_post(
@@ -316,7 +347,9 @@ async def delete_post(
             detail="Not authorized to delete this post"
         )
     
+    remove_post_from_timelines(db, post_id)
     db.delete(post)
+    record_event(db, POST_DELETED, post_id, user_id=current_user.id)
     db.commit()
     
     return APIResponse(
@@ -332,32 +365,23 @@ async def toggle_post_like(
 ):
     """Toggle like/unlike on a post"""
     
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post_exists = db.query(Post.id).filter(Post.id == post_id).scalar()
     
-    if not post:
+    if post_exists is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
     
-    # Check if user already liked the post
-    if current_user in post.liked_by:
-        # Unlike the post
-        post.liked_by.remove(current_user)
-        message = "Post unliked successfully"
-        is_liked = False
-    else:
-        # Like the post
-        post.liked_by.append(current_user)
-        message = "Post liked successfully"
-        is_liked = True
-    
+    # Likes are `like` reactions; unliking removes any reaction the user left
+    state = toggle_like(db, post_id, current_user.id)
     db.commit()
     
+    is_liked = state.reaction is not None
     return APIResponse(
         success=True,
-        message=message,
-        data={"is_liked": is_liked, "likes_count": len(post.liked_by)}
+        message="Post liked successfully" if is_liked else "Post unliked successfully",
+        data={"is_liked": is_liked, "likes_count": state.likes_count, "reaction": state.reaction}
     )
 
 @router.post("/{post_id}/reactions", response_model=APIResponse)
@@ -369,71 +393,72 @@ async def react_to_post(
 ):
     """Add/update/remove a reaction to a post"""
     
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post_exists = db.query(Post.id).filter(Post.id == post_id).scalar()
     
-    if not post:
+    if post_exists is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
     
-    # Check if user already has a reaction on this post
-    existing_reaction = db.query(PostReaction).filter(
-        PostReaction.user_id == current_user.id,
-        PostReaction.post_id == post_id
-    ).first()
-    
-    # If reaction_type is empty, remove any existing reaction
-    if not reaction_data.reaction_type or reaction_data.reaction_type.strip() == '':
-        if existing_reaction:
-            db.delete(existing_reaction)
-            db.commit()
-            return APIResponse(
-                success=True,
-                message="Reaction removed successfully",
-                data={"reaction": None}
-            )
-        else:
-            return APIResponse(
-                success=True,
-                message="No reaction to remove",
-                data={"reaction": None}
-            )
+    reaction_type = (reaction_data.reaction_type or "").strip() or None
+    if reaction_type is not None and reaction_type not in REACTION_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown reaction type; expected one of {', '.join(REACTION_TYPES)}"
+        )
     
-    if existing_reaction:
-        if existing_reaction.reaction_type == reaction_data.reaction_type:
-            # Remove reaction if it's the same
-            db.delete(existing_reaction)
-            db.commit()
-            return APIResponse(
-                success=True,
-                message="Reaction removed successfully",
-                data={"reaction": None}
-            )
-        else:
-            # Update reaction type
-            existing_reaction.reaction_type = reaction_data.reaction_type
-            db.commit()
-            return APIResponse(
-                success=True,
-                message="Reaction updated successfully",
-                data={"reaction": reaction_data.reaction_type}
-            )
+    state = toggle_post_reaction(db, post_id, current_user.id, reaction_type)
+    db.commit()
+    
+    if state.reaction and not state.changed:
+        message = "Reaction unchanged"
+    elif state.reaction and state.previous:
+        message = "Reaction updated successfully"
+    elif state.reaction:
+        message = "Reaction added successfully"
+    elif state.changed:
+        message = "Reaction removed successfully"
     else:
-        # Create new reaction
-        new_reaction = PostReaction(
-            user_id=current_user.id,
-            post_id=post_id,
-            reaction_type=reaction_data.reaction_type
-        )
-        db.add(new_reaction)
-        db.commit()
-        
-        return APIResponse(
-            success=True,
-            message="Reaction added successfully",
-            data={"reaction": reaction_data.reaction_type}
+        message = "No reaction to remove"
+    
+    return APIResponse(
+        success=True,
+        message=message,
+        data={
+            "reaction": state.reaction,
+            "likes_count": state.likes_count,
+            "reaction_counts": state.reaction_counts
+        }
+    )
+
+@router.get("/{post_id}/reactions", response_model=ReactionPage)
+async def get_post_reactions(
+    post_id: int,
+    reaction_type: Optional[str] = Query(None, alias="type", pattern="^(like|love|haha|wow|angry)$"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """Get who reacted to a post, newest first, optionally of one reaction type"""
+    
+    if not db.query(Post.id).filter(Post.id == post_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found"
         )
+    
+    reactions_query = db.query(PostReaction).options(
+        joinedload(PostReaction.user)
+    ).filter(PostReaction.post_id == post_id)
+    if reaction_type:
+        reactions_query = reactions_query.filter(PostReaction.reaction_type == reaction_type)
+    reactions, next_cursor = paginate_keyset(
+        reactions_query, PostReaction.created_at, PostReaction.id, cursor=cursor, limit=limit
+    )
+    
+    return ReactionPage(items=reactions, next_cursor=next_cursor)
 
 @router.post("/{post_id}/comments", response_model=CommentResponse)
 async def create_comment(
@@ -452,14 +477,32 @@ async def create_comment(
             detail="Post not found"
         )
     
+    # Replies must belong to the same post as the comment they answer
+    if comment_data.parent_comment_id is not None:
+        parent_comment = db.query(Comment).filter(
+            Comment.id == comment_data.parent_comment_id,
+            Comment.post_id == post_id
+        ).first()
+        if not parent_comment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Parent comment not found"
+            )
+    
     # Create new comment
     db_comment = Comment(
         content=comment_data.content,
         post_id=post_id,
-        author_id=current_user.id
+        author_id=current_user.id,
+        parent_comment_id=comment_data.parent_comment_id
     )
     
     db.add(db_comment)
+    adjust_post_counters(db, post_id, comments=1)
+    if comment_data.parent_comment_id is not None:
+        adjust_comment_counters(db, comment_data.parent_comment_id, replies=1)
+    db.flush()
+    record_event(db, COMMENT_CREATED, post_id, user_id=current_user.id, comment_id=db_comment.id)
     db.commit()
     db.refresh(db_comment)
     
@@ -468,17 +511,57 @@ async def create_comment(
         joinedload(Comment.author)
     ).filter(Comment.id == db_comment.id).first()
     
-    return CommentResponse(
-        id=comment_with_author.id,
-        content=comment_with_author.content,
-        post_id=comment_with_author.post_id,
-        author_id=comment_with_author.author_id,
-        author=comment_with_author.author,
-        created_at=comment_with_author.created_at,
-        updated_at=comment_with_author.updated_at or comment_with_author.created_at,
-        likes_count=0,
-        is_liked=False
+    return build_comment_response(comment_with_author)
+
+@router.get("/{post_id}/comments", response_model=CommentPage)
+async def get_post_comments(
+    post_id: int,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """Get a post's top-level comments, newest first, one page at a time"""
+    
+    if not db.query(Post.id).filter(Post.id == post_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found"
+        )
+    
+    comments_query = db.query(Comment).options(
+        joinedload(Comment.author)
+    ).filter(
+        Comment.post_id == post_id,
+        Comment.parent_comment_id.is_(None)
+    )
+    comments, next_cursor = paginate_keyset(
+        comments_query, Comment.created_at, Comment.id, cursor=cursor, limit=limit
     )
+    
+    return CommentPage(
+        items=[build_comment_response(comment) for comment in comments],
+        next_cursor=next_cursor
+    )
+
+@router.get("/comments/{comment_id}/thread", response_model=CommentThreadResponse)
+async def get_comment_thread_endpoint(
+    comment_id: int,
+    max_depth: int = Query(3, ge=1, le=10),
+    max_replies: int = Query(10, ge=1, le=50),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """Get a comment with its replies, bounded in depth and replies per comment"""
+    
+    thread = get_comment_thread(db, comment_id, max_depth=max_depth, max_replies=max_replies)
+    if not thread:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Comment not found"
+        )
+    
+    return thread
 
 @router.put("/comments/{comment_id}", response_model=CommentResponse)
 async def update_comment(
@@ -511,6 +594,7 @@ async def update_comment(
     from datetime import datetime
     comment.updated_at = datetime.utcnow()
     
+    record_event(db, COMMENT_UPDATED, comment.post_id, user_id=current_user.id, comment_id=comment_id)
     db.commit()
     db.refresh(comment)
     
@@ -519,17 +603,7 @@ async def update_comment(
         joinedload(Comment.author)
     ).filter(Comment.id == comment_id).first()
     
-    return CommentResponse(
-        id=comment_with_author.id,
-        content=comment_with_author.content,
-        post_id=comment_with_author.post_id,
-        author_id=comment_with_author.author_id,
-        author=comment_with_author.author,
-        created_at=comment_with_author.created_at,
-        updated_at=comment_with_author.updated_at or comment_with_author.created_at,
-        likes_count=0,
-        is_liked=False
-    )
+    return build_comment_response(comment_with_author)
 
 @router.delete("/comments/{comment_id}", response_model=APIResponse)
 async def delete_comment(
@@ -554,8 +628,12 @@ async def delete_comment(
             detail="Not authorized to delete this comment"
         )
     
-    # Delete the comment
+    # Delete the comment; its replies are kept and detached from it
+    adjust_post_counters(db, comment.post_id, comments=-1)
+    if comment.parent_comment_id is not None:
+        adjust_comment_counters(db, comment.parent_comment_id, replies=-1)
     db.delete(comment)
+    record_event(db, COMMENT_DELETED, comment.post_id, user_id=current_user.id, comment_id=comment_id)
     db.commit()
     
     return APIResponse(
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.models.database import User
+from app.models.schemas import SearchPage
+from app.api.auth import get_current_user_dependency
+from app.services.search import search_posts
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("/posts", response_model=SearchPage)
+async def search_posts_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db)
+):
+    """
+    Search posts by their content and their comments.
+    
+    Results are ranked by relevance; each carries a highlighted snippet of
+    the best matching text and whether it came from the post or a comment.
+    """
+    return search_posts(db, q, current_user, cursor=cursor, limit=limit)
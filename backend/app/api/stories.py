@@ -1,32 +1,51 @@
 """
 Stories API endpoints.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
-from app.models.database import Story, StoryImage, User
+from app.models.database import Story, User
 from app.core.auth import get_current_user
+from app.services.loaders import attach, story_images_loader, user_loader
+from app.services.versions import PROFILES, etag_headers, etag_matches, get_versions, make_etag, not_modified
 from datetime import datetime
 
 router = APIRouter()
 
 @router.get("/stories", response_model=List[dict])
 async def get_stories(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all active stories with their images."""
     try:
+        # Stories have no write API and change by expiring, so the token
+        # summarizes the active set instead of using a write sequence
+        active_summary = db.query(
+            func.count(Story.id), func.max(Story.id)
+        ).filter(Story.expires_at > datetime.now()).one()
+        etag = make_etag("stories", tuple(active_summary), get_versions(db, PROFILES))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers.update(etag_headers(etag))
+        
         # Get all stories that haven't expired yet
         stories = db.query(Story).filter(Story.expires_at > datetime.now()).all()
         
+        # Authors and images for every story with one IN query each
+        attach(stories, "author", "author_id", user_loader(db))
+        images_by_story = dict(zip(
+            (story.id for story in stories),
+            story_images_loader(db).load_many(story.id for story in stories)
+        ))
+        
         result = []
         for story in stories:
-            # Get all images for this story, ordered by order_index
-            images = db.query(StoryImage).filter(
-                StoryImage.story_id == story.id
-            ).order_by(StoryImage.order_index).all()
+            images = images_by_story[story.id]
             
             story_data = {
                 "id": story.id,
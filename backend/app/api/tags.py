@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.core.database import get_db
+from app.core.pagination import paginate_keyset
+from app.models.database import Mention, PostTag, User
+from app.models.schemas import MentionResponse, PostResponse
+from app.api.auth import get_current_user_dependency
+from app.services.feed import build_post_responses
+from app.services.loaders import attach, post_loader, user_loader
+from app.services.tags import normalize_tag
+
+router = APIRouter(prefix="/tags", tags=["tags"])
+mentions_router = APIRouter(prefix="/mentions", tags=["mentions"])
+
+@router.get("/{tag}/posts", response_model=List[PostResponse])
+async def get_tag_posts(
+    tag: str,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    per_page: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db)
+):
+    """Get the newest posts carrying a hashtag"""
+    
+    tag_query = db.query(PostTag).filter(PostTag.tag == normalize_tag(tag))
+    entries, next_cursor = paginate_keyset(
+        tag_query, PostTag.created_at, PostTag.post_id, cursor=cursor, limit=per_page
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    posts = [post for post in post_loader(db).load_many(entry.post_id for entry in entries) if post is not None]
+    attach(posts, "author", "author_id", user_loader(db))
+    return build_post_responses(db, posts, current_user)
+
+@mentions_router.get("", response_model=List[MentionResponse])
+async def get_my_mentions(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header"),
+    per_page: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user_dependency),
+    db: Session = Depends(get_db)
+):
+    """Get the posts and comments that mention the current user, newest first"""
+    
+    mention_query = db.query(Mention).filter(Mention.user_id == current_user.id)
+    mentions, next_cursor = paginate_keyset(
+        mention_query, Mention.created_at, Mention.id, cursor=cursor, limit=per_page
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    users = user_loader(db)
+    posts = {
+        post.id: post
+        for post in post_loader(db).load_many(mention.post_id for mention in mentions) if post is not None
+    }
+    attach(posts.values(), "author", "author_id", users)
+    post_responses = {post.id: post for post in build_post_responses(db, list(posts.values()), current_user)}
+    authors = users.load_many(mention.author_id for mention in mentions)
+    
+    return [
+        MentionResponse(
+            id=mention.id,
+            post_id=mention.post_id,
+            comment_id=mention.comment_id,
+            author=author,
+            created_at=mention.created_at,
+            post=post_responses[mention.post_id]
+        )
+        for mention, author in zip(mentions, authors) if mention.post_id in post_responses
+    ]
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Query
+from app.models.schemas import TrendingPost, TrendingResponse, TrendingTag
+from app.services.trending import trending_posts, trending_tags
+
+router = APIRouter(prefix="/trending", tags=["trending"])
+
+@router.get("", response_model=TrendingResponse)
+async def get_trending(limit: int = Query(10, ge=1, le=100)):
+    """
+    Posts and hashtags with the most recent engagement.
+    
+    Scores decay exponentially, so a burst of reactions and comments counts
+    for more than the same total spread over days. Served from memory.
+    """
+    return TrendingResponse(
+        posts=[TrendingPost(post_id=int(key), score=score) for key, score in trending_posts.leaders(limit)],
+        tags=[TrendingTag(tag=key, score=score) for key, score in trending_tags.leaders(limit)]
+    )
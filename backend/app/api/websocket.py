@@ -1,8 +1,8 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.auth import verify_token
-from app.models.database import User, Message
+from app.core.auth import get_authenticated_user, verify_token
+from app.models.database import Message
 from app.services.websocket import websocket_manager
 import json
 
@@ -20,7 +20,7 @@ async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
     
     db = next(get_db())
     try:
-        user = db.query(User).filter(User.username == token_data.username).first()
+        user = get_authenticated_user(db, token_data)
         if not user:
             await websocket.close(code=4002, reason="User not found")
             return
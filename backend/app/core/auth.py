@@ -9,7 +9,13 @@ from app.core.config import settings
 from app.core.database import get_db
 from app.models.database import User, RefreshToken
 from app.models.schemas import TokenData
+from app.services.hashing import password_hash_pool
+from app.services.sessions import (
+    cap_sessions, end_session, hash_refresh_token, session_registry
+)
+from app.services.user_cache import attach_cached_user, user_cache
 import secrets
+import time
 
 # Security scheme
 security = HTTPBearer()
@@ -25,6 +31,25 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool, keeping the event loop free"""
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool, keeping the event loop free"""
+    return await password_hash_pool.run(get_password_hash, password)
+
+def access_token_claims(user: User, session_id: int) -> dict:
+    """Claims that let requests authorize without loading the user"""
+    return {
+        "sub": user.username,
+        "uid": user.id,
+        "gen": user.session_generation or 0,
+        "sid": session_id,
+        # Fractional, so a session id reused right after a logout is not revoked with it
+        "iat": time.time(),
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create access token"""
     to_encode = data.copy()
@@ -48,18 +73,24 @@ def verify_token(token: str) -> Optional[TokenData]:
         username: str = payload.get("sub")
         if username is None:
             return None
-        token_data = TokenData(username=username)
+        token_data = TokenData(
+            username=username,
+            user_id=payload.get("uid"),
+            generation=payload.get("gen", 0),
+            session_id=payload.get("sid"),
+            issued_at=payload.get("iat")
+        )
         return token_data
     except JWTError:
         return None
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """Authenticate user by username and password"""
     user = db.query(User).filter(
         (User.username == username) | (User.email == username)
     ).first()
     
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password_async(password, user.hashed_password):
         return None
     return user
 
@@ -69,25 +100,54 @@ def get_user_by_username(db: Session, username: str) -> Optional[User]:
         (User.username == username) | (User.email == username)
     ).first()
 
+def get_authenticated_user(db: Session, token_data: TokenData) -> Optional[User]:
+    """
+    Resolve the user of a verified access token, or None if it was revoked.
+    
+    Revocation is checked in memory and users come from the authenticated-user
+    cache, so most requests authorize without a query; a miss is a primary
+    key lookup.
+    """
+    if token_data.user_id is None:
+        # Issued before ids were embedded; these expire within access_token_expire_minutes
+        return get_user_by_username(db, token_data.username)
+    if session_registry.is_revoked(
+        token_data.user_id, token_data.generation, token_data.session_id, token_data.issued_at
+    ):
+        return None
+    
+    values = user_cache.get(token_data.user_id)
+    if values is not None:
+        return attach_cached_user(db, values)
+    
+    generation = user_cache.generation
+    user = db.get(User, token_data.user_id)
+    if user is None or token_data.generation < (user.session_generation or 0):
+        return None
+    user_cache.put(user, generation)
+    return user
+
 def create_user_tokens(db: Session, user: User) -> dict:
     """Create access and refresh tokens for user"""
-    # Create access token
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    
     # Create refresh token
     refresh_token = create_refresh_token()
     refresh_token_expires = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
     
-    # Save refresh token to database
+    # Save the refresh token's digest; the client keeps the token itself
     db_refresh_token = RefreshToken(
-        token=refresh_token,
+        token=hash_refresh_token(refresh_token),
         user_id=user.id,
         expires_at=refresh_token_expires
     )
     db.add(db_refresh_token)
+    # Flushes, which assigns the id the access token names its session by
+    cap_sessions(db, user.id)
+    
+    # Create access token
+    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+    access_token = create_access_token(
+        data=access_token_claims(user, db_refresh_token.id), expires_delta=access_token_expires
+    )
     db.commit()
     
     return {
@@ -99,7 +159,7 @@ def create_user_tokens(db: Session, user: User) -> dict:
 def refresh_access_token(db: Session, refresh_token: str) -> Optional[dict]:
     """Refresh access token using refresh token"""
     db_refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == refresh_token,
+        RefreshToken.token == hash_refresh_token(refresh_token),
         RefreshToken.expires_at > datetime.utcnow()
     ).first()
     
@@ -113,7 +173,7 @@ def refresh_access_token(db: Session, refresh_token: str) -> Optional[dict]:
     # Create new access token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=access_token_claims(user, db_refresh_token.id), expires_delta=access_token_expires
     )
     
     return {
@@ -122,14 +182,13 @@ def refresh_access_token(db: Session, refresh_token: str) -> Optional[dict]:
     }
 
 def revoke_refresh_token(db: Session, refresh_token: str) -> bool:
-    """Revoke refresh token (logout)"""
-    db_refresh_token = db.query(RefreshToken).filter(
-        RefreshToken.token == refresh_token
+    """Revoke refresh token (logout), along with the access tokens of its session"""
+    db_refresh_token = db.query(RefreshToken.id, RefreshToken.user_id).filter(
+        RefreshToken.token == hash_refresh_token(refresh_token)
     ).first()
     
     if db_refresh_token:
-        db.delete(db_refresh_token)
-        db.commit()
+        end_session(db, db_refresh_token.id, db_refresh_token.user_id)
         return True
     return False
 
@@ -144,16 +203,11 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    token_data = verify_token(credentials.credentials)
+    if token_data is None:
         raise credentials_exception
     
-    user = get_user_by_username(db, username=username)
+    user = get_authenticated_user(db, token_data)
     if user is None:
         raise credentials_exception
     
@@ -10,6 +10,14 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 60
     refresh_token_expire_days: int = 7
+    user_cache_max_entries: int = 10000  # authenticated users resolved without a query
+    user_cache_ttl_seconds: float = 30.0
+    session_revocation_refresh_seconds: float = 30.0  # logout and password changes reach other processes within this
+    max_sessions_per_user: int = 10  # oldest refresh tokens are revoked beyond this
+    refresh_token_purge_interval_seconds: float = 3600.0  # expired refresh tokens are swept this often
+    refresh_token_purge_batch_size: int = 1000  # rows deleted per transaction
+    password_hash_workers: int = 4  # bcrypt hashes running at once, off the event loop
+    password_hash_max_queue: int = 64  # hashes waiting beyond that before logins get 429
     
     # Server
     port: int = 8000
@@ -22,6 +30,33 @@ class Settings(BaseSettings):
     # WebSocket
     websocket_url: str = "ws://localhost:8000/ws"
     
+    # Feed
+    feed_comment_preview_count: int = 3  # latest comments embedded per post in feed pages
+    timeline_fanout_batch_size: int = 500  # follower timelines written per transaction
+    timeline_fanout_max_followers: int = 10000  # above this, followers pull the author's posts on read
+    ranking_candidate_limit: int = 1000  # newest posts scored per ranked feed request
+    ranked_snapshot_max_entries: int = 1000  # ranked orders kept for cursor paging
+    ranked_snapshot_ttl_seconds: float = 600.0  # cursors of a ranked feed expire after this
+    feed_cache_max_entries: int = 256  # cached feed pages kept in memory
+    feed_cache_ttl_seconds: float = 30.0
+    sample_snapshot_max_age_seconds: float = 30.0  # anonymous sample feed is re-rendered at least this often
+    sample_snapshot_stale_seconds: float = 300.0  # shared caches may serve it stale while revalidating
+    multiget_max_ids: int = 100  # posts fetched per GET /api/posts?ids= request
+    change_log_page_size: int = 500  # change log entries applied per /api/posts/changes response
+    change_log_retention_days: int = 7  # older sync tokens must refetch the feed
+    change_log_prune_interval_seconds: float = 3600.0  # entries past retention are pruned this often
+    
+    # Trending
+    trending_half_life_seconds: float = 3600.0  # engagement loses half its weight per half-life
+    trending_top_k: int = 100  # posts and tags tracked exactly
+    trending_sketch_width: int = 4096  # count-min columns; error shrinks as width grows
+    trending_sketch_depth: int = 4  # count-min rows; failure odds shrink as depth grows
+    trending_snapshot_path: str = "trending_snapshot.npz"
+    trending_snapshot_interval_seconds: float = 60.0
+    
+    # Batch writes
+    batch_max_operations: int = 200  # operations accepted per /api/batch request
+    
     # Upload
     max_file_size: int = 10485760  # 10MB
     upload_folder: str = "uploads/"
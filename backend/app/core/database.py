@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine
+from typing import List
+from sqlalchemy import create_engine, func, inspect, select, text
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
-from app.models.database import Base
+from app.models.database import Base, PostReaction
 
 # Create database engine
 engine = create_engine(
@@ -12,9 +13,109 @@ engine = create_engine(
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Indexes superseded by a wider one declared on the models
+RETIRED_INDEXES = [
+    "ix_post_reactions_post_id_type", "ix_post_reactions_post_id_type_created_at",
+    "ix_comments_post_id_created_at_id"
+]
+
+# Tables paged by keyset on created_at
+KEYSET_TABLES = ["posts", "comments", "post_reactions", "home_timelines", "post_tags", "mentions"]
+
 # Create all tables
-def create_tables():
+def create_tables() -> List[str]:
+    """Create missing tables, columns and indexes; return the changes that need counters rebuilt"""
     Base.metadata.create_all(bind=engine)
+    changes = add_missing_columns()
+    if migrate_post_likes():
+        changes.append("post_likes")
+    if remove_duplicate_reactions():
+        changes.append("post_reactions.duplicates")
+    normalize_timestamps()
+    # create_all skips tables that already exist, so add any newly declared indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        for index_name in RETIRED_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+    return changes
+
+def add_missing_columns() -> List[str]:
+    """Add columns declared on the models but missing from existing tables"""
+    added_columns = []
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                if column.server_default is not None:
+                    # NOT NULL can only be added alongside a default for the existing rows
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                connection.execute(text(ddl))
+                added_columns.append(f"{table.name}.{column.name}")
+    return added_columns
+
+def normalize_timestamps():
+    """
+    Rewrite SQLite created_at values in the 'YYYY-MM-DD HH:MM:SS.ffffff' form SQLAlchemy binds.
+    
+    Rows written by SQL now(), CURRENT_TIMESTAMP or isoformat() lack the
+    microseconds or use a 'T' separator. Stored as text, they compare out of
+    order against cursor parameters and repeat across keyset pages.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        for table in KEYSET_TABLES:
+            connection.execute(text(
+                f"UPDATE {table} SET created_at = replace(created_at, 'T', ' ') WHERE created_at LIKE '%T%'"
+            ))
+            connection.execute(text(
+                f"UPDATE {table} SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+            ))
+            connection.execute(text(
+                f"UPDATE {table} SET created_at = substr(created_at || '00000', 1, 26) "
+                f"WHERE length(created_at) BETWEEN 21 AND 25"
+            ))
+
+def migrate_post_likes() -> bool:
+    """Move the retired post_likes table into post_reactions as `like` reactions"""
+    if "post_likes" not in inspect(engine).get_table_names():
+        return False
+    with engine.begin() as connection:
+        # A user who both liked and reacted keeps the explicit reaction
+        connection.execute(text(
+            "INSERT INTO post_reactions (user_id, post_id, reaction_type, created_at, updated_at) "
+            "SELECT l.user_id, l.post_id, 'like', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+            "FROM post_likes l WHERE NOT EXISTS ("
+            "SELECT 1 FROM post_reactions r WHERE r.user_id = l.user_id AND r.post_id = l.post_id)"
+        ))
+        connection.execute(text("DROP TABLE post_likes"))
+    return True
+
+def remove_duplicate_reactions() -> int:
+    """Keep the newest reaction per user and post before the unique index is added"""
+    reactions = PostReaction.__table__
+    existing = {index["name"] for index in inspect(engine).get_indexes(reactions.name)}
+    if "uq_post_reactions_user_id_post_id" in existing:
+        return 0
+    newest = select(func.max(reactions.c.id)).group_by(reactions.c.user_id, reactions.c.post_id)
+    with engine.begin() as connection:
+        return connection.execute(reactions.delete().where(reactions.c.id.not_in(newest))).rowcount
+
+def dialect_insert(db):
+    """Dialect-specific INSERT construct that supports ON CONFLICT"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
 
 # Dependency to get database session
 def get_db():
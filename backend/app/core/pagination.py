@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination helpers.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+def encode_position(values: List[Any]) -> str:
+    """Encode a JSON-serializable sort position as an opaque cursor string"""
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_position(cursor: str) -> List[Any]:
+    """Decode an opaque cursor back into its sort position values"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError(cursor)
+        return values
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor string"""
+    return encode_position([created_at.isoformat(), item_id])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode an opaque cursor back into its (created_at, id) position"""
+    try:
+        created_at, item_id = decode_position(cursor)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def paginate_keyset(
+    query,
+    created_column,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: int = 10
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Return one page of `query` ordered newest first by (created_at, id).
+    
+    Rows are located with a range condition on the composite key instead of
+    an OFFSET, so the cost of a page does not depend on how deep it is.
+    """
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created_column, id_column) < (created_at, last_id))
+    
+    rows = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    
+    return rows, next_cursor
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Table, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -11,15 +11,9 @@ friendship_table = Table(
     'friendships',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('friend_id', Integer, ForeignKey('users.id'), primary_key=True)
-)
-
-# Association table for post likes
-post_likes_table = Table(
-    'post_likes',
-    Base.metadata,
-    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
-    Column('post_id', Integer, ForeignKey('posts.id'), primary_key=True)
+    Column('friend_id', Integer, ForeignKey('users.id'), primary_key=True),
+    # Followers of a user (rows pointing at them) are looked up during timeline fan-out
+    Index('ix_friendships_friend_id', 'friend_id')
 )
 
 # Association table for comment likes
@@ -42,6 +36,9 @@ class User(Base):
     bio = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)
     is_online = Column(Boolean, default=False)
+    fanout_on_read = Column(Boolean, nullable=False, default=False, server_default="0")  # Too many followers to fan out on write
+    session_generation = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped to revoke access tokens
+    sessions_revoked_at = Column(DateTime, index=True)  # When session_generation was last bumped
     last_seen = Column(DateTime, default=func.now())
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -61,12 +58,6 @@ class User(Base):
         back_populates="friends"
     )
     
-    liked_posts = relationship(
-        "Post",
-        secondary=post_likes_table,
-        back_populates="liked_by"
-    )
-    
     liked_comments = relationship(
         "Comment",
         secondary=comment_likes_table,
@@ -80,18 +71,67 @@ class Post(Base):
     content = Column(Text, nullable=False)
     image_url = Column(String(500), nullable=True)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=func.now())
+    # Set in Python so every row shares the microsecond format used by feed cursors
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
+    # Engagement counters, maintained on write (see app.services.counters)
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")  # reactions of any type
+    comments_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reaction_counts = Column(JSON, nullable=False, default=dict, server_default="{}")  # {reaction_type: count}
+    
     # Relationships
     author = relationship("User", back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
-    liked_by = relationship(
-        "User",
-        secondary=post_likes_table,
-        back_populates="liked_posts"
-    )
     reactions = relationship("PostReaction", cascade="all, delete-orphan")
+    
+    # Composite keys for keyset pagination of the newsfeed and of an author's posts
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_author_id_created_at_id", "author_id", "created_at", "id"),
+    )
+
+class TimelineEntry(Base):
+    __tablename__ = "home_timelines"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    created_at = Column(DateTime, nullable=False)  # Copy of the post's created_at, for ordering
+    
+    # A home feed page is a range scan on (user_id, created_at, post_id)
+    __table_args__ = (
+        Index("ix_home_timelines_user_id_created_at", "user_id", "created_at", "post_id"),
+        Index("ix_home_timelines_post_id", "post_id"),
+    )
+
+class PostTag(Base):
+    __tablename__ = "post_tags"
+    
+    tag = Column(String(100), primary_key=True)  # lowercased, without the leading '#'
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    created_at = Column(DateTime, nullable=False)  # Copy of the post's created_at, for ordering
+    
+    # A tag page is a range scan on (tag, created_at, post_id)
+    __table_args__ = (
+        Index("ix_post_tags_tag_created_at", "tag", "created_at", "post_id"),
+        Index("ix_post_tags_post_id", "post_id"),
+    )
+
+class Mention(Base):
+    __tablename__ = "mentions"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # the mentioned user
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=True)  # None for mentions in the post itself
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False)  # Copy of the post's or comment's created_at
+    
+    # A user's mentions timeline is a range scan on (user_id, created_at, id)
+    __table_args__ = (
+        Index("ix_mentions_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_mentions_post_id", "post_id"),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -101,9 +141,14 @@ class Comment(Base):
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     parent_comment_id = Column(Integer, ForeignKey("comments.id"), nullable=True)  # For reply functionality
-    created_at = Column(DateTime, default=func.now())
+    # Set in Python so every row shares the microsecond format used by comment cursors
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
+    # Engagement counters, maintained on write (see app.services.counters)
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    replies_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Relationships
     post = relationship("Post", back_populates="comments")
     author = relationship("User", back_populates="comments")
@@ -114,6 +159,12 @@ class Comment(Base):
         secondary=comment_likes_table,
         back_populates="liked_comments"
     )
+    
+    # Per-post keyset pagination, comment previews and reply trees
+    __table_args__ = (
+        Index("ix_comments_post_id_parent_comment_id_created_at_id", "post_id", "parent_comment_id", "created_at", "id"),
+        Index("ix_comments_parent_comment_id_created_at", "parent_comment_id", "created_at", "id"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -133,14 +184,22 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
     
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String(500), unique=True, index=True, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime, nullable=False)
+    token = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 hex digest of the token
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime, default=func.now())
     
     # Relationships
     user = relationship("User")
 
+class RevokedSession(Base):
+    __tablename__ = "revoked_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, nullable=False)  # Id of the refresh token the session was signed in with
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    revoked_at = Column(DateTime, nullable=False, index=True)
+
 class Story(Base):
     __tablename__ = "stories"
     
@@ -167,6 +226,29 @@ class StoryImage(Base):
     # Relationships
     story = relationship("Story", back_populates="images")
 
+class ResourceVersion(Base):
+    __tablename__ = "resource_versions"
+    
+    # Write sequence per resource set ("profiles", "chats:<user_id>"), used for ETags
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class PostChange(Base):
+    __tablename__ = "change_log"
+    
+    # The autoincrement id is the monotonic change token handed to syncing clients
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    post_id = Column(Integer, nullable=False)  # no foreign key: deleted posts stay in the log
+    change_type = Column(String(20), nullable=False)  # created, updated, deleted, counters
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow, index=True)
+    
+    # Never reuse ids of pruned rows, so tokens stay monotonic
+    __table_args__ = (
+        # The last change of each post on a feed page, for its ETag
+        Index("ix_change_log_post_id_id", "post_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
 class PostReaction(Base):
     __tablename__ = "post_reactions"
     
@@ -174,7 +256,8 @@ class PostReaction(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     reaction_type = Column(String(20), nullable=False)  # like, love, haha, wow, angry
-    created_at = Column(DateTime, default=func.now())
+    # Set in Python like posts and comments, so keyset cursors compare at full precision
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
     # Relationships
@@ -183,5 +266,9 @@ class PostReaction(Base):
     
     # Ensure only one reaction per user per post
     __table_args__ = (
+        Index("uq_post_reactions_user_id_post_id", "user_id", "post_id", unique=True),
+        # Who-reacted pages, newest first by (created_at, id), of all types and per type
+        Index("ix_post_reactions_post_id_created_at_id", "post_id", "created_at", "id"),
+        Index("ix_post_reactions_post_id_type_created_at_id", "post_id", "reaction_type", "created_at", "id"),
         {"schema": None},
     )
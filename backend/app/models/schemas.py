@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 
 # User schemas
@@ -38,6 +38,14 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    user_id: Optional[int] = None  # None in tokens issued before ids were embedded
+    generation: int = 0
+    session_id: Optional[int] = None  # Refresh token id of the signed-in session
+    issued_at: Optional[float] = None
+
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str = Field(..., min_length=8)
 
 class LoginRequest(BaseModel):
     username: str
@@ -70,6 +78,10 @@ class ReactionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ReactionPage(BaseModel):
+    items: List[ReactionResponse]
+    next_cursor: Optional[str] = None
+
 # Comment schemas (defined before PostResponse to avoid forward reference issues)
 class CommentBase(BaseModel):
     content: str
@@ -95,6 +107,13 @@ class CommentResponse(CommentBase):
     class Config:
         from_attributes = True
 
+class CommentThreadResponse(CommentResponse):
+    replies: List["CommentThreadResponse"] = []
+
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
+
 class PostResponse(PostBase):
     id: int
     author_id: int
@@ -104,14 +123,61 @@ class PostResponse(PostBase):
     likes_count: int = 0
     comments_count: int = 0
     shares_count: int = 0
+    reaction_counts: Dict[str, int] = {}
     is_liked: bool = False
     current_user_reaction: Optional[str] = None
-    reactions: List[ReactionResponse] = []
     comments: List[CommentResponse] = []
     
     class Config:
         from_attributes = True
 
+class PostCounters(BaseModel):
+    id: int
+    likes_count: int = 0
+    comments_count: int = 0
+    reaction_counts: Dict[str, int] = {}
+
+class PostChanges(BaseModel):
+    created: List[PostResponse] = []
+    updated: List[PostResponse] = []
+    deleted: List[int] = []
+    counters: List[PostCounters] = []
+    next_token: str
+    has_more: bool = False
+
+# Mention schemas
+class MentionResponse(BaseModel):
+    id: int
+    post_id: int
+    comment_id: Optional[int] = None  # None when the mention is in the post itself
+    author: UserResponse
+    created_at: datetime
+    post: PostResponse
+
+# Search schemas
+class SearchResult(BaseModel):
+    post: PostResponse
+    score: float  # bm25, lower is better
+    matched_in: str  # "post" or "comment"
+    snippet: str  # HTML-escaped, matches wrapped in <mark>
+
+class SearchPage(BaseModel):
+    items: List[SearchResult]
+    next_cursor: Optional[str] = None
+
+# Trending schemas
+class TrendingPost(BaseModel):
+    post_id: int
+    score: float  # decayed engagement
+
+class TrendingTag(BaseModel):
+    tag: str
+    score: float
+
+class TrendingResponse(BaseModel):
+    posts: List[TrendingPost]
+    tags: List[TrendingTag]
+
 # Message schemas
 class MessageBase(BaseModel):
     content: str
@@ -157,6 +223,27 @@ class APIResponse(BaseModel):
     message: str
     data: Optional[dict] = None
 
+# Batch schemas
+class BatchOperation(BaseModel):
+    op: Literal["react", "like", "mark_read"]
+    post_id: Optional[int] = None  # react, like
+    reaction_type: Optional[str] = None  # react; empty removes the reaction
+    user_id: Optional[int] = None  # mark_read: the sender whose messages were read
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1)
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: str
+    success: bool
+    status_code: int
+    detail: Optional[str] = None
+    data: Optional[dict] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchOperationResult]
+
 class PaginatedResponse(BaseModel):
     items: List[dict]
     total: int
@@ -0,0 +1,172 @@
+"""
+Change log behind delta sync of the feed.
+
+Every post, comment and reaction write appends a row per touched post to
+`change_log`, inside the transaction of the write. Clients keep the id of
+the last row they applied as their sync token. They then fetch only what
+changed since that token instead of re-downloading feed pages. Rows past
+`change_log_retention_days` are pruned on the background worker every
+`change_log_prune_interval_seconds`, keeping the newest row so the log
+always knows the current position. Pruning can also run from cron:
+
+    python -m app.services.changes
+"""
+import datetime
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import PostChange, User
+from app.models.schemas import PostChanges, PostCounters
+from app.services.events import (
+    PostEvent, subscribe_in_transaction, POST_CREATED, POST_UPDATED, POST_DELETED
+)
+from app.services.feed import build_post_responses
+from app.services.loaders import attach, post_loader, user_loader
+from app.services.worker import background_worker
+
+# Change types
+COUNTERS = "counters"
+UPDATED = "updated"
+CREATED = "created"
+DELETED = "deleted"
+
+CHANGE_TYPES = {POST_CREATED: CREATED, POST_UPDATED: UPDATED, POST_DELETED: DELETED}
+
+@subscribe_in_transaction
+def append_changes(db: Session, events: List[PostEvent]):
+    """Append one change row per post and change type touched by the transaction"""
+    rows = list(dict.fromkeys(
+        (event.post_id, CHANGE_TYPES.get(event.kind, COUNTERS)) for event in events
+    ))
+    now = datetime.datetime.utcnow()
+    db.execute(insert(PostChange), [
+        {"post_id": post_id, "change_type": change_type, "created_at": now}
+        for post_id, change_type in rows
+    ])
+
+def encode_token(change_id: int) -> str:
+    return str(change_id)
+
+def decode_token(token: str) -> int:
+    try:
+        change_id = int(token)
+    except ValueError:
+        change_id = -1
+    if change_id < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+    return change_id
+
+def collapse_changes(rows: List[Tuple[int, str]]) -> Dict[int, Optional[str]]:
+    """
+    Reduce ordered (post_id, change_type) rows to one net change per post.
+    
+    A post created and deleted inside the window nets out to None.
+    """
+    net: Dict[int, Optional[str]] = {}
+    for post_id, change_type in rows:
+        previous = net.get(post_id)
+        if change_type == DELETED:
+            net[post_id] = None if previous == CREATED else DELETED
+        elif previous in (CREATED, DELETED) and change_type != CREATED:
+            continue
+        elif previous == UPDATED and change_type == COUNTERS:
+            continue
+        else:
+            net[post_id] = change_type
+    return net
+
+def get_changes_since(db: Session, since: Optional[str], viewer: User) -> PostChanges:
+    """Net post changes after the `since` token, at most one page of log rows"""
+    if since is None:
+        # First sync: hand out the current position only
+        latest = db.query(func.max(PostChange.id)).scalar() or 0
+        return PostChanges(next_token=encode_token(latest))
+    
+    since_id = decode_token(since)
+    oldest = db.query(func.min(PostChange.id)).scalar()
+    # Pruning keeps the newest row, so an empty log has never handed out a later token
+    if (oldest is None and since_id > 0) or (oldest is not None and since_id < oldest - 1):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token has expired; refetch the feed"
+        )
+    
+    limit = settings.change_log_page_size
+    rows = db.query(PostChange.id, PostChange.post_id, PostChange.change_type).filter(
+        PostChange.id > since_id
+    ).order_by(PostChange.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_token = encode_token(rows[-1].id if rows else since_id)
+    
+    net = collapse_changes([(row.post_id, row.change_type) for row in rows])
+    live_ids = [post_id for post_id, change_type in net.items() if change_type not in (None, DELETED)]
+    posts = post_loader(db).load_many(live_ids)
+    posts_by_id = {post.id: post for post in posts if post is not None}
+    
+    changes = PostChanges(next_token=next_token, has_more=has_more)
+    # Posts deleted after this window are already gone, so report them as deleted
+    changes.deleted = [
+        post_id for post_id, change_type in net.items()
+        if change_type == DELETED or (change_type is not None and post_id not in posts_by_id)
+    ]
+    
+    full_posts = [posts_by_id[post_id] for post_id in live_ids
+                  if post_id in posts_by_id and net[post_id] in (CREATED, UPDATED)]
+    attach(full_posts, "author", "author_id", user_loader(db))
+    for response in build_post_responses(db, full_posts, viewer):
+        if net[response.id] == CREATED:
+            changes.created.append(response)
+        else:
+            changes.updated.append(response)
+    
+    changes.counters = [
+        PostCounters(
+            id=post.id,
+            likes_count=post.likes_count or 0,
+            comments_count=post.comments_count or 0,
+            reaction_counts=post.reaction_counts or {}
+        )
+        for post_id, post in posts_by_id.items() if net[post_id] == COUNTERS
+    ]
+    return changes
+
+def prune_change_log(db: Session, retention_days: int = settings.change_log_retention_days) -> int:
+    """Delete change rows older than the retention window, except the newest; return how many went"""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)
+    newest = db.query(func.max(PostChange.id)).scalar()
+    pruned = db.query(PostChange).filter(
+        PostChange.created_at < cutoff, PostChange.id < newest
+    ).delete(synchronize_session=False) if newest is not None else 0
+    db.commit()
+    return pruned
+
+_pruning_started = False
+
+def _prune_in_background():
+    db = SessionLocal()
+    try:
+        prune_change_log(db)
+    finally:
+        db.close()
+
+def start_change_log_pruning():
+    """Prune the change log on the background worker now and then every interval"""
+    global _pruning_started
+    if _pruning_started:
+        return
+    _pruning_started = True
+    background_worker.every(settings.change_log_prune_interval_seconds, _prune_in_background)
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(f"Pruned {prune_change_log(db)} change log entries")
+    finally:
+        db.close()
@@ -0,0 +1,17 @@
+"""
+Chat write helpers shared by the REST, WebSocket and batch endpoints.
+"""
+from sqlalchemy.orm import Session
+from app.models.database import Message
+from app.services.versions import bump_version, chats_resource
+
+def mark_chat_read(db: Session, reader_id: int, sender_id: int) -> int:
+    """Mark the sender's unread messages to the reader as read; the caller commits"""
+    marked = db.query(Message).filter(
+        Message.sender_id == sender_id,
+        Message.receiver_id == reader_id,
+        Message.is_read == False
+    ).update({"is_read": True}, synchronize_session=False)
+    if marked:
+        bump_version(db, chats_resource(reader_id), chats_resource(sender_id))
+    return marked
@@ -0,0 +1,60 @@
+"""
+Threaded comment loading.
+"""
+from typing import Dict, Optional
+from sqlalchemy import literal, select
+from sqlalchemy.orm import Session, aliased, joinedload
+from app.models.database import Comment
+from app.models.schemas import CommentThreadResponse
+from app.services.feed import build_comment_response
+
+def get_comment_thread(
+    db: Session,
+    comment_id: int,
+    max_depth: int = 3,
+    max_replies: int = 10
+) -> Optional[CommentThreadResponse]:
+    """
+    Load a comment and its reply tree in one recursive CTE query.
+    
+    Each level descends at most `max_depth` times and keeps only the oldest
+    `max_replies` replies of every node; `replies_count` on each node tells
+    the client whether more replies exist than were returned.
+    """
+    thread = select(
+        Comment.id, literal(0).label("depth")
+    ).where(
+        Comment.id == comment_id
+    ).cte("thread", recursive=True)
+    
+    reply = aliased(Comment)
+    # Correlated on the thread node, so each level reads at most `max_replies` replies per node
+    first_replies = select(reply.id).where(
+        reply.parent_comment_id == thread.c.id
+    ).order_by(reply.created_at, reply.id).limit(max_replies)
+    
+    thread = thread.union_all(
+        select(
+            Comment.id, thread.c.depth + 1
+        ).select_from(thread).join(
+            Comment, Comment.id.in_(first_replies.scalar_subquery())
+        ).where(
+            thread.c.depth < max_depth
+        )
+    )
+    
+    comments = db.query(Comment).options(
+        joinedload(Comment.author)
+    ).join(
+        thread, thread.c.id == Comment.id
+    ).order_by(Comment.created_at, Comment.id).all()
+    
+    nodes: Dict[int, CommentThreadResponse] = {
+        comment.id: CommentThreadResponse(**build_comment_response(comment).model_dump())
+        for comment in comments
+    }
+    for comment in comments:
+        if comment.id != comment_id and comment.parent_comment_id in nodes:
+            nodes[comment.parent_comment_id].replies.append(nodes[comment.id])
+    
+    return nodes.get(comment_id)
@@ -0,0 +1,114 @@
+"""
+Denormalized engagement counters on posts and comments.
+
+Write paths adjust the counters in the same transaction as the rows they
+count; `rebuild_counters` recomputes them from the source tables and can be
+run as a reconciliation command:
+
+    python -m app.services.counters
+"""
+from typing import Optional
+from sqlalchemy import JSON, Integer, bindparam, case, cast, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB, array
+from sqlalchemy.orm import Session
+from app.models.database import Post, Comment, PostReaction, comment_likes_table
+
+def adjust_post_counters(
+    db: Session,
+    post_id: int,
+    likes: int = 0,
+    comments: int = 0,
+    reaction_added: Optional[str] = None,
+    reaction_removed: Optional[str] = None
+):
+    """Apply counter deltas to a post without touching its updated_at"""
+    values = {Post.updated_at: Post.updated_at}
+    # likes_count counts reactions of every type, so only adds and removes move it
+    likes += bool(reaction_added) - bool(reaction_removed)
+    if likes:
+        values[Post.likes_count] = Post.likes_count + likes
+    if comments:
+        values[Post.comments_count] = Post.comments_count + comments
+    if reaction_added or reaction_removed:
+        # Shifted in SQL, so concurrent toggles on the same post cannot lose updates
+        dialect = db.get_bind().dialect.name
+        reaction_counts = Post.reaction_counts
+        if reaction_removed:
+            reaction_counts = _shift_reaction_count(reaction_counts, reaction_removed, -1, dialect)
+        if reaction_added:
+            reaction_counts = _shift_reaction_count(reaction_counts, reaction_added, 1, dialect)
+        values[Post.reaction_counts] = reaction_counts
+    
+    db.query(Post).filter(Post.id == post_id).update(values, synchronize_session=False)
+
+def _shift_reaction_count(reaction_counts, reaction_type: str, delta: int, dialect: str):
+    """SQL expression adding `delta` to one key of a reaction histogram, dropping keys that reach 0"""
+    if dialect == "postgresql":
+        reaction_counts = cast(reaction_counts, JSONB)
+        count = func.coalesce(cast(reaction_counts.op("->>")(reaction_type), Integer), 0) + delta
+        shifted = func.jsonb_set(reaction_counts, array([reaction_type]), func.to_jsonb(count))
+        return cast(case((count <= 0, reaction_counts.op("-")(reaction_type)), else_=shifted), JSON)
+    # Reaction types are validated identifiers, so they are safe inside a JSON path
+    path = f'$."{reaction_type}"'
+    count = func.coalesce(func.json_extract(reaction_counts, path), 0) + delta
+    return case(
+        (count <= 0, func.json_remove(reaction_counts, path)),
+        else_=func.json_set(reaction_counts, path, count)
+    )
+
+def adjust_comment_counters(db: Session, comment_id: int, likes: int = 0, replies: int = 0):
+    """Apply counter deltas to a comment without touching its updated_at"""
+    values = {Comment.updated_at: Comment.updated_at}
+    if likes:
+        values[Comment.likes_count] = Comment.likes_count + likes
+    if replies:
+        values[Comment.replies_count] = Comment.replies_count + replies
+    
+    db.query(Comment).filter(Comment.id == comment_id).update(values, synchronize_session=False)
+
+def rebuild_counters(db: Session):
+    """Recompute every post and comment counter from the source tables"""
+    
+    def count_where(column, value):
+        return select(func.count()).where(column == value).scalar_subquery()
+    
+    db.query(Post).update({
+        Post.likes_count: count_where(PostReaction.post_id, Post.id),
+        Post.comments_count: count_where(Comment.post_id, Post.id),
+        Post.reaction_counts: {},
+        Post.updated_at: Post.updated_at
+    }, synchronize_session=False)
+    
+    reaction_counts = {}
+    rows = db.query(
+        PostReaction.post_id, PostReaction.reaction_type, func.count(PostReaction.id)
+    ).group_by(PostReaction.post_id, PostReaction.reaction_type)
+    for post_id, reaction_type, count in rows:
+        reaction_counts.setdefault(post_id, {})[reaction_type] = count
+    if reaction_counts:
+        posts = Post.__table__
+        db.execute(
+            update(posts).where(posts.c.id == bindparam("post_id")).values(
+                reaction_counts=bindparam("counts"), updated_at=posts.c.updated_at
+            ),
+            [{"post_id": post_id, "counts": counts} for post_id, counts in reaction_counts.items()]
+        )
+    
+    replies = Comment.__table__.alias("replies")
+    db.query(Comment).update({
+        Comment.likes_count: count_where(comment_likes_table.c.comment_id, Comment.id),
+        Comment.replies_count: count_where(replies.c.parent_comment_id, Comment.id),
+        Comment.updated_at: Comment.updated_at
+    }, synchronize_session=False)
+    
+    db.commit()
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+    
+    db = SessionLocal()
+    try:
+        rebuild_counters(db)
+        print("Engagement counters rebuilt successfully!")
+    finally:
+        db.close()
@@ -0,0 +1,81 @@
+"""
+Post write events.
+
+Write paths record what they changed on the session with `record_event`.
+In-transaction subscribers may write rows alongside the change just before
+the commit; once the transaction commits, the batch is handed to every
+subscriber. Events of a rolled back transaction are dropped.
+"""
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Event kinds
+POST_CREATED = "post_created"
+POST_UPDATED = "post_updated"
+POST_DELETED = "post_deleted"
+COMMENT_CREATED = "comment_created"
+COMMENT_UPDATED = "comment_updated"
+COMMENT_DELETED = "comment_deleted"
+# Reaction kinds include legacy likes; CHANGED is a switch to another type
+REACTION_ADDED = "reaction_added"
+REACTION_CHANGED = "reaction_changed"
+REACTION_REMOVED = "reaction_removed"
+
+@dataclass(frozen=True)
+class PostEvent:
+    kind: str
+    post_id: int
+    user_id: Optional[int] = None
+    comment_id: Optional[int] = None
+
+EventHandler = Callable[[List[PostEvent]], None]
+TransactionHandler = Callable[[Session, List[PostEvent]], None]
+_subscribers: List[EventHandler] = []
+_transaction_subscribers: List[TransactionHandler] = []
+
+def subscribe(handler: EventHandler) -> EventHandler:
+    """Register a handler called with each committed batch of events"""
+    _subscribers.append(handler)
+    return handler
+
+def subscribe_in_transaction(handler: TransactionHandler) -> TransactionHandler:
+    """Register a handler that writes alongside the events, just before commit"""
+    _transaction_subscribers.append(handler)
+    return handler
+
+def record_event(
+    db: Session,
+    kind: str,
+    post_id: int,
+    user_id: Optional[int] = None,
+    comment_id: Optional[int] = None
+):
+    """Queue an event to be published when `db` commits"""
+    db.info.setdefault("post_events", []).append(
+        PostEvent(kind=kind, post_id=post_id, user_id=user_id, comment_id=comment_id)
+    )
+
+@event.listens_for(Session, "before_commit")
+def _write_with_events(session: Session):
+    events = session.info.get("post_events")
+    if not events:
+        return
+    for handler in _transaction_subscribers:
+        handler(session, events)
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session: Session):
+    events = session.info.pop("post_events", None)
+    if not events:
+        return
+    for handler in _subscribers:
+        try:
+            handler(events)
+        except Exception as e:
+            print(f"Post event handler {handler.__name__} failed: {e}")
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_events(session: Session, previous_transaction):
+    session.info.pop("post_events", None)
@@ -0,0 +1,150 @@
+"""
+Feed serialization and engagement aggregation for posts.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session, aliased, joinedload
+from app.core.config import settings
+from app.models.database import Post, Comment, PostReaction, User
+from app.models.schemas import PostResponse, CommentResponse
+
+@dataclass
+class ViewerState:
+    """A viewer's own engagement with a single post"""
+    is_liked: bool = False
+    current_user_reaction: Optional[str] = None
+
+def get_viewer_state(
+    db: Session,
+    post_ids: Iterable[int],
+    viewer: Optional[User] = None
+) -> Dict[int, ViewerState]:
+    """
+    Look up the viewer's reaction for a batch of posts.
+    
+    Counters are read from the denormalized post columns, so this is the only
+    per-page engagement work left: one indexed query over the page's ids.
+    A like is a reaction of type `like`, so `is_liked` means any reaction.
+    """
+    post_ids = list(post_ids)
+    state = {post_id: ViewerState() for post_id in post_ids}
+    if not viewer or not post_ids:
+        return state
+    
+    own_reactions = db.query(PostReaction.post_id, PostReaction.reaction_type).filter(
+        PostReaction.user_id == viewer.id,
+        PostReaction.post_id.in_(post_ids)
+    )
+    for post_id, reaction_type in own_reactions:
+        state[post_id].is_liked = True
+        state[post_id].current_user_reaction = reaction_type
+    
+    return state
+
+def get_comment_previews(
+    db: Session,
+    post_ids: Iterable[int],
+    limit: int = settings.feed_comment_preview_count
+) -> Dict[int, List[Comment]]:
+    """
+    Load the latest `limit` top-level comments of each post, oldest first.
+    
+    Each post of the page picks its previews with a correlated `LIMIT` on
+    `ix_comments_post_id_parent_comment_id_created_at_id`, so one query reads
+    at most `limit` index entries per post however long its discussion is.
+    """
+    post_ids = list(post_ids)
+    previews = {post_id: [] for post_id in post_ids}
+    if not post_ids or limit <= 0:
+        return previews
+    
+    latest = aliased(Comment)
+    latest_ids = db.query(latest.id).filter(
+        latest.post_id == Post.id,
+        latest.parent_comment_id.is_(None)
+    ).order_by(
+        latest.created_at.desc(), latest.id.desc()
+    ).limit(limit).correlate(Post)
+    
+    comments = db.query(Comment).select_from(Post).join(
+        Comment, Comment.id.in_(latest_ids)
+    ).options(
+        joinedload(Comment.author)
+    ).filter(
+        Post.id.in_(post_ids)
+    ).order_by(Comment.created_at, Comment.id).all()
+    
+    for comment in comments:
+        previews[comment.post_id].append(comment)
+    
+    return previews
+
+def build_comment_response(comment: Comment) -> CommentResponse:
+    """Serialize a comment with its author"""
+    return CommentResponse(
+        id=comment.id,
+        content=comment.content,
+        post_id=comment.post_id,
+        author_id=comment.author_id,
+        author=comment.author,
+        created_at=comment.created_at,
+        updated_at=comment.updated_at or comment.created_at,
+        parent_comment_id=comment.parent_comment_id,
+        likes_count=comment.likes_count or 0,
+        replies_count=comment.replies_count or 0,
+        is_liked=False
+    )
+
+def build_post_responses(
+    db: Session,
+    posts: List[Post],
+    viewer: Optional[User] = None,
+    include_details: bool = False
+) -> List[PostResponse]:
+    """
+    Serialize posts with their engagement counters and the viewer's state.
+    
+    Reactions ship as per-type counts plus the viewer's own; who reacted is
+    paged separately. With `include_details` the latest comments are embedded.
+    """
+    post_ids = [post.id for post in posts]
+    viewer_state = get_viewer_state(db, post_ids, viewer)
+    comment_previews = get_comment_previews(db, post_ids) if include_details else {}
+    
+    responses = []
+    for post in posts:
+        post_state = viewer_state[post.id]
+        comments = []
+        if include_details:
+            comments = [build_comment_response(comment) for comment in comment_previews[post.id]]
+        
+        responses.append(PostResponse(
+            id=post.id,
+            content=post.content,
+            image_url=post.image_url,
+            author_id=post.author_id,
+            author=post.author,
+            created_at=post.created_at,
+            updated_at=post.updated_at,
+            likes_count=post.likes_count or 0,
+            comments_count=post.comments_count or 0,
+            shares_count=0,
+            reaction_counts=post.reaction_counts or {},
+            is_liked=post_state.is_liked,
+            current_user_reaction=post_state.current_user_reaction,
+            comments=comments
+        ))
+    
+    return responses
+
+def overlay_viewer_state(db: Session, items: List[dict], viewer: Optional[User] = None) -> List[dict]:
+    """Copy serialized posts, filling in the viewer's like and reaction"""
+    viewer_state = get_viewer_state(db, [item["id"] for item in items], viewer)
+    return [
+        {
+            **item,
+            "is_liked": viewer_state[item["id"]].is_liked,
+            "current_user_reaction": viewer_state[item["id"]].current_user_reaction,
+        }
+        for item in items
+    ]
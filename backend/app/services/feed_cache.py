@@ -0,0 +1,137 @@
+"""
+In-process cache of serialized feed pages.
+
+Pages are stored without viewer-specific fields (`is_liked`,
+`current_user_reaction`), so every viewer shares one entry per page and the
+viewer's state is overlaid per request. Entries expire after a TTL, the
+least recently used ones are evicted beyond `max_entries`, and post write
+events invalidate exactly the pages that contain the affected posts.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Set
+from app.core.config import settings
+from app.services.events import (
+    PostEvent, POST_CREATED, POST_DELETED, subscribe
+)
+
+@dataclass
+class CachedPage:
+    items: List[dict]  # JSON-ready PostResponse dicts, without viewer state
+    next_cursor: Optional[str] = None
+    head: bool = False  # page content shifts when a new post is created
+    expires_at: float = 0.0
+    post_ids: Set[int] = field(default_factory=set)
+
+class FeedCache:
+    """LRU + TTL cache of feed pages with per-post invalidation"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Hashable, CachedPage]" = OrderedDict()
+        self.keys_by_post: Dict[int, Set[Hashable]] = {}
+        self.lock = threading.Lock()
+        # Bumped by every invalidation, so pages built concurrently are not stored stale
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def get_or_build(
+        self,
+        key: Hashable,
+        build: Callable[[], CachedPage]
+    ) -> CachedPage:
+        """Return the cached page for `key`, building and storing it on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self.generation
+        
+        page = build()
+        page.expires_at = time.monotonic() + self.ttl_seconds
+        page.post_ids = {item["id"] for item in page.items}
+        
+        with self.lock:
+            if generation == self.generation and self.max_entries > 0:
+                self._remove(key)
+                self.entries[key] = page
+                for post_id in page.post_ids:
+                    self.keys_by_post.setdefault(post_id, set()).add(key)
+                while len(self.entries) > self.max_entries:
+                    self._remove(next(iter(self.entries)))
+                    self.evictions += 1
+        return page
+    
+    def invalidate_posts(self, post_ids: Set[int]):
+        """Drop every page containing one of `post_ids`"""
+        with self.lock:
+            self.generation += 1
+            for post_id in post_ids:
+                for key in list(self.keys_by_post.get(post_id, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+    
+    def invalidate_heads(self):
+        """Drop pages whose content shifts when posts are added or removed"""
+        with self.lock:
+            self.generation += 1
+            for key in [key for key, entry in self.entries.items() if entry.head]:
+                self._remove(key)
+                self.invalidations += 1
+    
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+            self.keys_by_post.clear()
+    
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+    
+    def _remove(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for post_id in entry.post_ids:
+            keys = self.keys_by_post.get(post_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_post[post_id]
+
+# Global feed cache instance
+feed_cache = FeedCache(settings.feed_cache_max_entries, settings.feed_cache_ttl_seconds)
+
+@subscribe
+def invalidate_feed_cache(events: List[PostEvent]):
+    """Invalidate the pages touched by a committed batch of post events"""
+    if any(event.kind in (POST_CREATED, POST_DELETED) for event in events):
+        feed_cache.invalidate_heads()
+    feed_cache.invalidate_posts({event.post_id for event in events})
@@ -183,6 +183,13 @@ async def init_sample_data():
                     comment['created_at']
                 ))
         
+        # Keep the denormalized comment counters in step with the rows inserted above
+        cursor.execute(f"""
+            UPDATE posts SET comments_count = (
+                SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id
+            ) WHERE id IN ({', '.join('?' * len(post_ids))})
+        """, post_ids)
+        
         conn.commit()
         print("Sample data initialized successfully!")
         
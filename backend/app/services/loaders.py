@@ -0,0 +1,87 @@
+"""
+DataLoader-style batched lookups for request handlers.
+
+A `BatchLoader` collects the keys a handler needs and resolves all unseen
+keys with one `IN (...)` query per chunk. Results are cached for the life of
+the loader, which is one request. Handlers build loaders per request and
+attach the results to ORM objects with `attach`, so serializing a page costs
+a fixed number of queries however many rows it has.
+"""
+from collections import defaultdict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.database import Message, Post, StoryImage, User
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+class BatchLoader(Generic[K, V]):
+    """Resolve keys in batches through `batch_fn`, caching results per loader"""
+    
+    def __init__(
+        self,
+        batch_fn: Callable[[List[K]], Dict[K, V]],
+        max_batch_size: int = 500,
+        default: Callable[[], Optional[V]] = lambda: None
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.default = default
+        self.cache: Dict[K, Optional[V]] = {}
+    
+    def prime(self, key: K, value: V):
+        """Seed the cache with a value the caller already has"""
+        self.cache.setdefault(key, value)
+    
+    def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        """Return values in key order, fetching unseen keys in batches"""
+        keys = list(keys)
+        missing = list(dict.fromkeys(key for key in keys if key not in self.cache))
+        for start in range(0, len(missing), self.max_batch_size):
+            chunk = missing[start:start + self.max_batch_size]
+            found = self.batch_fn(chunk)
+            for key in chunk:
+                self.cache[key] = found[key] if key in found else self.default()
+        return [self.cache[key] for key in keys]
+    
+    def load(self, key: K) -> Optional[V]:
+        """Return the value for one key"""
+        return self.load_many([key])[0]
+
+def attach(objects: Iterable[Any], attribute: str, key_attribute: str, loader: BatchLoader):
+    """
+    Load a relationship for many objects at once and set it without a lazy load.
+    
+    Values are set as already-committed state, so the session does not treat
+    the objects as modified.
+    """
+    objects = list(objects)
+    values = loader.load_many(getattr(obj, key_attribute) for obj in objects)
+    for obj, value in zip(objects, values):
+        set_committed_value(obj, attribute, value)
+
+def by_id(db: Session, model) -> BatchLoader:
+    """Loader of `model` rows by primary key"""
+    return BatchLoader(lambda ids: {row.id: row for row in db.query(model).filter(model.id.in_(ids))})
+
+def user_loader(db: Session) -> BatchLoader[int, User]:
+    return by_id(db, User)
+
+def post_loader(db: Session) -> BatchLoader[int, Post]:
+    return by_id(db, Post)
+
+def message_loader(db: Session) -> BatchLoader[int, Message]:
+    return by_id(db, Message)
+
+def story_images_loader(db: Session) -> BatchLoader[int, List[StoryImage]]:
+    """Loader of each story's images in display order"""
+    def load_images(story_ids: List[int]) -> Dict[int, List[StoryImage]]:
+        images = defaultdict(list)
+        rows = db.query(StoryImage).filter(
+            StoryImage.story_id.in_(story_ids)
+        ).order_by(StoryImage.story_id, StoryImage.order_index)
+        for image in rows:
+            images[image.story_id].append(image)
+        return images
+    return BatchLoader(load_images, default=list)
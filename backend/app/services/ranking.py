@@ -0,0 +1,218 @@
+"""
+Feed ranking: scores a batch of candidate posts with NumPy array operations.
+
+Candidates are retrieved first (the newest posts of the requested feed),
+turned into a `CandidateBatch` of column arrays, scored in one pass by the
+selected ranker and then paginated and serialized as usual.
+
+Scores move as engagement arrives and time passes, so re-ranking for every
+page would shift posts across page boundaries. The order computed for a
+first page is kept in `ranked_snapshots` under a random token, and the
+cursors of the following pages walk that same order.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.database import Post, Message, friendship_table
+from app.services.reactions import REACTION_TYPES
+
+EPOCH = datetime(1970, 1, 1)  # Timestamps are naive UTC throughout
+
+@dataclass
+class CandidateBatch:
+    """Ranking features of candidate posts, one array element per post"""
+    post_ids: np.ndarray  # int64
+    author_ids: np.ndarray  # int64
+    created_ts: np.ndarray  # float64, POSIX seconds (UTC)
+    likes: np.ndarray  # float64
+    comments: np.ndarray  # float64
+    reactions: np.ndarray  # float64, shape (n, len(REACTION_TYPES))
+    
+    def __len__(self) -> int:
+        return len(self.post_ids)
+
+@dataclass
+class Affinity:
+    """Viewer-to-author affinity, as sorted author ids and matching scores"""
+    author_ids: np.ndarray
+    scores: np.ndarray
+    
+    def lookup(self, author_ids: np.ndarray) -> np.ndarray:
+        """Vectorized affinity lookup; unknown authors score 0"""
+        if not len(self.author_ids):
+            return np.zeros(len(author_ids))
+        positions = np.searchsorted(self.author_ids, author_ids)
+        positions = np.clip(positions, 0, len(self.author_ids) - 1)
+        found = self.author_ids[positions] == author_ids
+        return np.where(found, self.scores[positions], 0.0)
+
+EMPTY_AFFINITY = Affinity(np.empty(0, dtype=np.int64), np.empty(0))
+
+def build_candidate_batch(rows: Sequence) -> CandidateBatch:
+    """
+    Build a batch from (id, author_id, created_at, likes_count, comments_count,
+    reaction_counts) rows
+    """
+    count = len(rows)
+    if not count:
+        return CandidateBatch(*(np.empty(0) for _ in range(5)), np.empty((0, len(REACTION_TYPES))))
+    
+    post_ids, author_ids, created_at, likes, comments, reaction_counts = zip(*rows)
+    reactions = np.zeros((count, len(REACTION_TYPES)))
+    for column, reaction_type in enumerate(REACTION_TYPES):
+        reactions[:, column] = [(counts or {}).get(reaction_type, 0) for counts in reaction_counts]
+    
+    return CandidateBatch(
+        post_ids=np.array(post_ids, dtype=np.int64),
+        author_ids=np.array(author_ids, dtype=np.int64),
+        created_ts=np.fromiter(
+            ((moment - EPOCH).total_seconds() for moment in created_at), dtype=np.float64, count=count
+        ),
+        likes=np.array(likes, dtype=np.float64),
+        comments=np.array(comments, dtype=np.float64),
+        reactions=reactions
+    )
+
+def utc_timestamp(moment: datetime) -> float:
+    """POSIX seconds for a naive UTC datetime, matching `CandidateBatch.created_ts`"""
+    return (moment - EPOCH).total_seconds()
+
+class ChronologicalRanker:
+    """Newest first, matching the unranked feed"""
+    
+    def score(self, batch: CandidateBatch, affinity: Affinity, now: float) -> np.ndarray:
+        return batch.created_ts
+    
+    def rank(self, batch: CandidateBatch, affinity: Affinity = EMPTY_AFFINITY, now: Optional[float] = None) -> np.ndarray:
+        """Return candidate post ids, best first"""
+        now = utc_timestamp(datetime.utcnow()) if now is None else now
+        scores = self.score(batch, affinity, now)
+        # Ties break towards the higher id, like the (created_at, id) feed order
+        order = np.lexsort((-batch.post_ids, -scores))
+        return batch.post_ids[order]
+
+class EngagementRanker(ChronologicalRanker):
+    """
+    Engagement-weighted score with exponential recency decay:
+    
+        (1 + w_r * log1p(reaction mix) + w_c * log1p(comment velocity)
+           + w_a * author affinity) * exp(-age_hours / half_life * ln 2)
+    """
+    
+    def __init__(
+        self,
+        half_life_hours: float = 12.0,
+        reaction_weight: float = 1.0,
+        comment_weight: float = 1.5,
+        affinity_weight: float = 2.0,
+        reaction_type_weights: Sequence[float] = (1.0, 2.0, 1.5, 1.5, 0.5)
+    ):
+        self.half_life_hours = half_life_hours
+        self.reaction_weight = reaction_weight
+        self.comment_weight = comment_weight
+        self.affinity_weight = affinity_weight
+        self.reaction_type_weights = np.asarray(reaction_type_weights, dtype=np.float64)
+    
+    def score(self, batch: CandidateBatch, affinity: Affinity, now: float) -> np.ndarray:
+        age_hours = np.maximum(now - batch.created_ts, 0.0) / 3600.0
+        decay = np.exp2(-age_hours / self.half_life_hours)
+        reaction_mix = batch.likes + batch.reactions @ self.reaction_type_weights
+        comment_velocity = batch.comments / np.maximum(age_hours, 1.0)
+        engagement = (
+            1.0
+            + self.reaction_weight * np.log1p(reaction_mix)
+            + self.comment_weight * np.log1p(comment_velocity)
+            + self.affinity_weight * affinity.lookup(batch.author_ids)
+        )
+        return engagement * decay
+
+RANKERS = {
+    "chronological": ChronologicalRanker(),
+    "engagement": EngagementRanker(),
+}
+
+def load_candidate_batch(db: Session, post_ids: Iterable[int]) -> CandidateBatch:
+    """Fetch ranking features for the given posts in one query"""
+    rows = db.query(
+        Post.id, Post.author_id, Post.created_at,
+        Post.likes_count, Post.comments_count, Post.reaction_counts
+    ).filter(Post.id.in_(list(post_ids))).all()
+    return build_candidate_batch(rows)
+
+def load_author_affinity(db: Session, viewer_id: int) -> Affinity:
+    """
+    Score how close the viewer is to each author: 1 for followed users plus
+    log1p of the number of messages exchanged with them.
+    """
+    scores: Dict[int, float] = {}
+    
+    followed = db.query(friendship_table.c.friend_id).filter(friendship_table.c.user_id == viewer_id)
+    for (author_id,) in followed:
+        scores[author_id] = 1.0
+    
+    other_party = case(
+        (Message.sender_id == viewer_id, Message.receiver_id),
+        else_=Message.sender_id
+    )
+    conversations = db.query(other_party, func.count(Message.id)).filter(
+        (Message.sender_id == viewer_id) | (Message.receiver_id == viewer_id)
+    ).group_by(other_party)
+    for author_id, message_count in conversations:
+        scores[author_id] = scores.get(author_id, 0.0) + float(np.log1p(message_count))
+    
+    if not scores:
+        return EMPTY_AFFINITY
+    author_ids = np.fromiter(sorted(scores), dtype=np.int64, count=len(scores))
+    return Affinity(author_ids, np.array([scores[author_id] for author_id in author_ids.tolist()]))
+
+def rank_posts(db: Session, post_ids: List[int], viewer_id: int, rank: str) -> List[int]:
+    """Order candidate post ids with the named ranker"""
+    ranker = RANKERS[rank]
+    batch = load_candidate_batch(db, post_ids)
+    affinity = load_author_affinity(db, viewer_id) if isinstance(ranker, EngagementRanker) else EMPTY_AFFINITY
+    return ranker.rank(batch, affinity).tolist()
+
+class RankedSnapshots:
+    """LRU + TTL store of ranked post orders, keyed by random token"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, Tuple[float, Hashable, np.ndarray]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def put(self, owner: Hashable, post_ids: Sequence[int]) -> str:
+        """Store an order for `owner` and return its token"""
+        token = secrets.token_urlsafe(12)
+        entry = (time.monotonic() + self.ttl_seconds, owner, np.asarray(post_ids, dtype=np.int64))
+        with self.lock:
+            self.entries[token] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return token
+    
+    def get(self, token: str, owner: Hashable) -> Optional[np.ndarray]:
+        """The order stored under `token`, if it is still kept and belongs to `owner`"""
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            expires_at, entry_owner, post_ids = entry
+            if expires_at <= time.monotonic():
+                del self.entries[token]
+                return None
+            if entry_owner != owner:
+                return None
+            self.entries.move_to_end(token)
+            return post_ids
+
+# Global ranked feed snapshot store
+ranked_snapshots = RankedSnapshots(settings.ranked_snapshot_max_entries, settings.ranked_snapshot_ttl_seconds)
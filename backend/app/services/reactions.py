@@ -0,0 +1,120 @@
+"""
+Post reaction writes.
+
+A user has at most one reaction per post, enforced by a unique index on
+(user_id, post_id). A toggle deletes the user's reaction, inserts its
+replacement if any, and applies both counter deltas in one UPDATE: at most
+three writes and a read-back of the counters. Counter deltas follow the rows
+the statements actually changed, so concurrent double-taps cannot create
+duplicate rows or inflate the counts.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import DateTime, String, text
+from sqlalchemy.orm import Session
+from app.core.database import dialect_insert
+from app.models.database import Post, PostReaction
+from app.services.counters import adjust_post_counters
+from app.services.events import record_event, REACTION_ADDED, REACTION_CHANGED, REACTION_REMOVED
+
+# Legacy likes are stored as reactions of this type
+LIKE = "like"
+REACTION_TYPES = (LIKE, "love", "haha", "wow", "angry")
+
+@dataclass
+class ReactionState:
+    """A viewer's reaction on a post after a write, with the post's counters"""
+    reaction: Optional[str]
+    previous: Optional[str]
+    changed: bool
+    likes_count: int = 0
+    reaction_counts: Dict[str, int] = field(default_factory=dict)
+
+def toggle_post_reaction(
+    db: Session,
+    post_id: int,
+    user_id: int,
+    reaction_type: Optional[str]
+) -> ReactionState:
+    """
+    Apply a reaction toggle inside the caller's transaction.
+    
+    Sending the current reaction again removes it, a different type replaces
+    it, and an empty type removes whatever is there. The caller commits.
+    """
+    previous, created_at = _take_reaction(db, post_id, user_id)
+    if reaction_type == previous:
+        reaction_type = None
+    return _put_reaction(db, post_id, user_id, reaction_type, previous, created_at)
+
+def toggle_like(db: Session, post_id: int, user_id: int) -> ReactionState:
+    """Like a post, or take back whatever reaction the user already has on it"""
+    previous, created_at = _take_reaction(db, post_id, user_id)
+    return _put_reaction(db, post_id, user_id, None if previous else LIKE, previous, created_at)
+
+def _take_reaction(db: Session, post_id: int, user_id: int) -> Tuple[Optional[str], Optional[datetime]]:
+    """
+    Delete the user's reaction on the post and return its type and created_at.
+    
+    The DELETE also takes the write lock, so nothing can change the row
+    between reading it and writing its replacement. SQLAlchemy 1.4 cannot
+    compile RETURNING for SQLite, hence the textual statement; it needs
+    SQLite 3.35 or later.
+    """
+    row = db.execute(
+        text(
+            "DELETE FROM post_reactions WHERE post_id = :post_id AND user_id = :user_id "
+            "RETURNING reaction_type, created_at"
+        ).columns(reaction_type=String, created_at=DateTime),
+        {"post_id": post_id, "user_id": user_id}
+    ).first()
+    return (row.reaction_type, row.created_at) if row else (None, None)
+
+def _put_reaction(
+    db: Session,
+    post_id: int,
+    user_id: int,
+    reaction_type: Optional[str],
+    previous: Optional[str],
+    created_at: Optional[datetime]
+) -> ReactionState:
+    """Insert the new reaction, if any, in place of the one taken, then shift the counters once"""
+    added = None
+    if reaction_type:
+        values = {"user_id": user_id, "post_id": post_id, "reaction_type": reaction_type}
+        if created_at is not None:
+            # A replaced reaction keeps its place in the post's reaction list
+            values["created_at"] = created_at
+        statement = dialect_insert(db)(PostReaction).values(**values).on_conflict_do_nothing(
+            index_elements=[PostReaction.user_id, PostReaction.post_id]
+        )
+        # Only a concurrent toggle on PostgreSQL can have inserted in between; it wins
+        if db.execute(statement).rowcount:
+            added = reaction_type
+    
+    changed = bool(added or previous)
+    if changed:
+        adjust_post_counters(db, post_id, reaction_added=added, reaction_removed=previous)
+        kind = REACTION_CHANGED if added and previous else REACTION_ADDED if added else REACTION_REMOVED
+        record_event(db, kind, post_id, user_id=user_id)
+    return _reaction_state(db, post_id, added, previous, changed)
+
+def _reaction_state(
+    db: Session,
+    post_id: int,
+    reaction: Optional[str],
+    previous: Optional[str],
+    changed: bool
+) -> ReactionState:
+    """Read back the post counters as seen by the current transaction"""
+    likes_count, reaction_counts = db.query(
+        Post.likes_count, Post.reaction_counts
+    ).filter(Post.id == post_id).one()
+    return ReactionState(
+        reaction=reaction,
+        previous=previous,
+        changed=changed,
+        likes_count=likes_count,
+        reaction_counts=reaction_counts or {}
+    )
@@ -0,0 +1,142 @@
+"""
+Full-text search over posts and comments with SQLite FTS5.
+
+`posts_fts` and `comments_fts` are external-content FTS5 indexes over the
+`content` column of their tables. Triggers keep them in step row by row, so
+every write updates only the terms of the row it touches. Results are
+ranked by bm25, with comment matches weighted below matches in the post
+itself. They are paged by keyset on (score, post_id).
+"""
+import html
+import re
+from typing import List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from app.core.pagination import decode_position, encode_position
+from app.models.database import User
+from app.models.schemas import SearchPage, SearchResult
+from app.services.feed import build_post_responses
+from app.services.loaders import attach, post_loader, user_loader
+
+# Comment hits rank below post hits of similar relevance (bm25 scores are negative)
+COMMENT_MATCH_WEIGHT = 0.5
+SNIPPET_TOKENS = 16
+
+# Highlight delimiters that cannot appear in escaped text
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+    "content, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF content ON {table} BEGIN "
+    "INSERT INTO {table}_fts({table}_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO {table}_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+SEARCH_QUERY = text(f"""
+    WITH hits AS (
+        SELECT rowid AS post_id, bm25(posts_fts) AS score, 'post' AS matched_in,
+               snippet(posts_fts, 0, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS}) AS snippet
+        FROM posts_fts WHERE posts_fts MATCH :query
+        UNION ALL
+        SELECT comments.post_id, bm25(comments_fts) * {COMMENT_MATCH_WEIGHT}, 'comment',
+               snippet(comments_fts, 0, '{_MARK_START}', '{_MARK_END}', '…', {SNIPPET_TOKENS})
+        FROM comments_fts JOIN comments ON comments.id = comments_fts.rowid
+        WHERE comments_fts MATCH :query
+    ), best AS (
+        SELECT post_id, score, matched_in, snippet,
+               ROW_NUMBER() OVER (PARTITION BY post_id ORDER BY score, matched_in DESC) AS position
+        FROM hits
+    )
+    SELECT post_id, score, matched_in, snippet FROM best
+    WHERE position = 1 AND (score > :after_score OR (score = :after_score AND post_id > :after_id))
+    ORDER BY score, post_id
+    LIMIT :limit
+""")
+
+def create_search_index(connection):
+    """Create the FTS5 tables and triggers, indexing existing rows the first time"""
+    existing = set(inspect(connection).get_table_names())
+    for table in ("posts", "comments"):
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement.format(table=table)))
+        if f"{table}_fts" not in existing:
+            connection.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+
+def to_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query.
+    
+    Every term must match, quotes make FTS5 syntax literal, and the last term
+    also matches as a prefix, for search-as-you-type.
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query must contain a word"
+        )
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a snippet and wrap the matched terms in <mark>"""
+    return html.escape(snippet).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+def search_posts(
+    db: Session,
+    query: str,
+    viewer: User,
+    cursor: Optional[str] = None,
+    limit: int = 10
+) -> SearchPage:
+    """One page of posts matching `query` in their content or comments, best first"""
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Search requires the SQLite FTS5 index"
+        )
+    
+    after_score, after_id = float("-inf"), 0
+    if cursor:
+        try:
+            score, post_id = decode_position(cursor)
+            after_score, after_id = float(score), int(post_id)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    rows = db.execute(SEARCH_QUERY, {
+        "query": to_match_query(query),
+        "after_score": after_score,
+        "after_id": after_id,
+        "limit": limit + 1,
+    }).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_position([rows[-1].score, rows[-1].post_id])
+    
+    posts = [post for post in post_loader(db).load_many(row.post_id for row in rows) if post is not None]
+    attach(posts, "author", "author_id", user_loader(db))
+    responses = {response.id: response for response in build_post_responses(db, posts, viewer)}
+    
+    items: List[SearchResult] = [
+        SearchResult(
+            post=responses[row.post_id],
+            score=row.score,
+            matched_in=row.matched_in,
+            snippet=highlight(row.snippet)
+        )
+        for row in rows if row.post_id in responses
+    ]
+    return SearchPage(items=items, next_cursor=next_cursor)
@@ -0,0 +1,245 @@
+"""
+Revocation of stateless access tokens.
+
+Access tokens are verified without the database. They carry the user's
+`session_generation` at issue time, the id of the refresh token their
+session was signed in with, and their issue time. Logging out revokes that
+one session: its refresh token is deleted and the session id recorded in
+`revoked_sessions`, so the user's other devices stay signed in. Changing the
+password bumps the generation instead, which revokes every access token
+issued before.
+
+Each process keeps the revocations of the last `access_token_expire_minutes`
+in memory; any token issued earlier has expired anyway. They are loaded at
+startup through indexes on the revocation times and refreshed on the
+registry's own worker thread every `session_revocation_refresh_seconds`, so
+the refresh never waits behind other background jobs. A revocation
+therefore applies at once in the process that made it, and within that
+interval everywhere else.
+
+Refresh tokens are stored as SHA-256 digests, capped per user, and swept
+once expired in bounded batches on the background worker, every
+`refresh_token_purge_interval_seconds` from startup. The sweep can also run
+from cron:
+
+    python -m app.services.sessions
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import RefreshToken, RevokedSession, User
+from app.services.user_cache import user_cache
+from app.services.worker import BackgroundWorker, background_worker
+
+def _timestamp(moment: datetime) -> float:
+    """POSIX time of a naive UTC datetime"""
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+class SessionRegistry:
+    """In-memory view of recent session revocations, refreshed from the database"""
+    
+    def __init__(self, name: str, refresh_seconds: float, window_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.window_seconds = window_seconds
+        # user id -> (generation, bumped at) and session id -> revoked at, as POSIX times
+        self.generations: Dict[int, Tuple[int, float]] = {}
+        self.sessions: Dict[int, float] = {}
+        self.refreshed_at = 0.0
+        self.refreshing = False
+        self.lock = threading.Lock()
+        self.worker = BackgroundWorker(name)
+    
+    def is_revoked(
+        self,
+        user_id: int,
+        generation: int,
+        session_id: Optional[int] = None,
+        issued_at: Optional[float] = None
+    ) -> bool:
+        """Whether a token issued at `generation` for `session_id` has since been revoked"""
+        self._schedule_refresh_if_stale()
+        bumped = self.generations.get(user_id)
+        if bumped is not None and generation < bumped[0]:
+            return True
+        revoked_at = self.sessions.get(session_id) if session_id is not None else None
+        # Refresh token ids can be reused once deleted, so only earlier tokens are revoked
+        return revoked_at is not None and (issued_at is None or issued_at <= revoked_at)
+    
+    def revoke_generation(self, user_id: int, generation: int, bumped_at: float):
+        """Revoke tokens of `user_id` issued before `generation`"""
+        with self.lock:
+            current = self.generations.get(user_id)
+            if current is None or generation > current[0]:
+                self.generations[user_id] = (generation, bumped_at)
+    
+    def revoke_session(self, session_id: int, revoked_at: float):
+        """Revoke tokens of `session_id` issued up to `revoked_at`"""
+        with self.lock:
+            self.sessions[session_id] = max(self.sessions.get(session_id, 0.0), revoked_at)
+    
+    def refresh(self):
+        """Reload the revocations of the last window from the database"""
+        since = datetime.utcnow() - timedelta(seconds=self.window_seconds)
+        db = SessionLocal()
+        try:
+            bumps = db.query(User.id, User.session_generation, User.sessions_revoked_at).filter(
+                User.sessions_revoked_at > since
+            ).all()
+            revoked = db.query(RevokedSession.session_id, func.max(RevokedSession.revoked_at)).filter(
+                RevokedSession.revoked_at > since
+            ).group_by(RevokedSession.session_id).all()
+        finally:
+            db.close()
+        
+        cutoff = _timestamp(since)
+        with self.lock:
+            # Keep local revocations the queries may have raced with
+            generations = {
+                user_id: entry for user_id, entry in self.generations.items() if entry[1] > cutoff
+            }
+            for user_id, generation, bumped_at in bumps:
+                current = generations.get(user_id)
+                if current is None or generation > current[0]:
+                    generations[user_id] = (generation, _timestamp(bumped_at))
+            sessions = {
+                session_id: revoked_at for session_id, revoked_at in self.sessions.items() if revoked_at > cutoff
+            }
+            for session_id, revoked_at in revoked:
+                sessions[session_id] = max(sessions.get(session_id, 0.0), _timestamp(revoked_at))
+            self.generations = generations
+            self.sessions = sessions
+            self.refreshed_at = time.monotonic()
+    
+    def _schedule_refresh_if_stale(self):
+        with self.lock:
+            if self.refreshing or time.monotonic() - self.refreshed_at < self.refresh_seconds:
+                return
+            self.refreshing = True
+        self.worker.submit(self._refresh_in_background)
+    
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+# Global session revocation registry
+session_registry = SessionRegistry(
+    "session-registry", settings.session_revocation_refresh_seconds, settings.access_token_expire_minutes * 60
+)
+
+def end_session(db: Session, session_id: int, user_id: int):
+    """Sign out one session: delete its refresh token, revoke its access tokens and commit"""
+    revoked_at = datetime.utcnow()
+    db.query(RefreshToken).filter(RefreshToken.id == session_id).delete(synchronize_session=False)
+    db.add(RevokedSession(session_id=session_id, user_id=user_id, revoked_at=revoked_at))
+    db.commit()
+    session_registry.revoke_session(session_id, _timestamp(revoked_at))
+
+def end_sessions(db: Session, user_id: int, revoke_refresh_tokens: bool = False) -> int:
+    """
+    Revoke every access token of the user, commit and return the new generation.
+    
+    The generation is bumped in SQL, so concurrent bumps cannot collapse into
+    one. Refresh tokens stay valid unless `revoke_refresh_tokens` is set, so
+    the user's other devices just refresh into the new generation.
+    """
+    bumped_at = datetime.utcnow()
+    db.query(User).filter(User.id == user_id).update({
+        User.session_generation: User.session_generation + 1,
+        User.sessions_revoked_at: bumped_at
+    }, synchronize_session=False)
+    generation = db.query(User.session_generation).filter(User.id == user_id).scalar()
+    if revoke_refresh_tokens:
+        db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete(synchronize_session=False)
+    db.commit()
+    # A bulk update skips the ORM events that invalidate cached users
+    user_cache.invalidate(user_id)
+    session_registry.revoke_generation(user_id, generation, _timestamp(bumped_at))
+    return generation
+
+def hash_refresh_token(token: str) -> str:
+    """Digest stored in place of a refresh token: fixed width, and useless if leaked"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def cap_sessions(db: Session, user_id: int, max_sessions: int = settings.max_sessions_per_user):
+    """Delete the user's oldest refresh tokens beyond `max_sessions`; the caller commits"""
+    db.flush()
+    excess = [row.id for row in db.query(RefreshToken.id).filter(
+        RefreshToken.user_id == user_id
+    ).order_by(RefreshToken.id.desc()).offset(max_sessions)]
+    if excess:
+        db.query(RefreshToken).filter(RefreshToken.id.in_(excess)).delete(synchronize_session=False)
+
+def purge_expired_refresh_tokens(db: Session, batch_size: int = settings.refresh_token_purge_batch_size) -> int:
+    """Delete expired refresh tokens one batch per transaction; return how many went"""
+    purged = 0
+    while True:
+        expired = [row.id for row in db.query(RefreshToken.id).filter(
+            RefreshToken.expires_at <= datetime.utcnow()
+        ).limit(batch_size)]
+        if expired:
+            db.query(RefreshToken).filter(RefreshToken.id.in_(expired)).delete(synchronize_session=False)
+            db.commit()
+            purged += len(expired)
+        if len(expired) < batch_size:
+            return purged
+
+def purge_revoked_sessions(db: Session) -> int:
+    """Delete session revocations older than any access token they could still apply to"""
+    since = datetime.utcnow() - timedelta(seconds=session_registry.window_seconds)
+    purged = db.query(RevokedSession).filter(RevokedSession.revoked_at <= since).delete(synchronize_session=False)
+    db.commit()
+    return purged
+
+def hash_stored_refresh_tokens(batch_size: int = settings.refresh_token_purge_batch_size) -> int:
+    """Replace refresh tokens stored in plain text by their digests; return how many changed"""
+    db = SessionLocal()
+    try:
+        hashed = 0
+        while True:
+            rows = db.query(RefreshToken.id, RefreshToken.token).filter(
+                func.length(RefreshToken.token) != 64
+            ).limit(batch_size).all()
+            db.bulk_update_mappings(RefreshToken, [
+                {"id": row.id, "token": hash_refresh_token(row.token)} for row in rows
+            ])
+            db.commit()
+            hashed += len(rows)
+            if len(rows) < batch_size:
+                return hashed
+    finally:
+        db.close()
+
+_purge_started = False
+
+def _purge_in_background():
+    db = SessionLocal()
+    try:
+        purge_expired_refresh_tokens(db)
+        purge_revoked_sessions(db)
+    finally:
+        db.close()
+
+def start_refresh_token_purge():
+    """Sweep expired refresh tokens on the background worker now and then every interval"""
+    global _purge_started
+    if _purge_started:
+        return
+    _purge_started = True
+    background_worker.every(settings.refresh_token_purge_interval_seconds, _purge_in_background)
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(f"Purged {purge_expired_refresh_tokens(db)} expired refresh tokens")
+        print(f"Purged {purge_revoked_sessions(db)} lapsed session revocations")
+    finally:
+        db.close()
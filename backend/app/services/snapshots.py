@@ -0,0 +1,137 @@
+"""
+Pre-rendered snapshots of public feed pages.
+
+The anonymous `/api/posts/sample` page is the same for every visitor. It is
+rendered off the request path to JSON bytes plus a gzipped copy, then served
+straight from memory. Post write events and a max age mark the snapshot
+stale. A stale snapshot keeps being served while a single background job
+re-renders it (stale-while-revalidate), so traffic spikes never reach the
+database.
+"""
+import gzip
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, List, Optional
+from sqlalchemy import desc
+from sqlalchemy.orm import joinedload
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import Post
+from app.services.events import PostEvent, POST_CREATED, POST_DELETED, subscribe
+from app.services.feed import build_post_responses
+from app.services.versions import make_etag
+from app.services.worker import BackgroundWorker
+
+SAMPLE_SIZE = 10
+
+@dataclass(frozen=True)
+class Snapshot:
+    body: bytes
+    gzipped: bytes
+    etag: str
+    built_at: float
+    post_ids: FrozenSet[int] = field(default_factory=frozenset)
+    
+    def headers(self, gzipped: bool) -> Dict[str, str]:
+        """Public caching headers; shared caches may also serve it stale while revalidating"""
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": (
+                f"public, max-age={int(settings.sample_snapshot_max_age_seconds)}, "
+                f"stale-while-revalidate={int(settings.sample_snapshot_stale_seconds)}"
+            ),
+            "Vary": "Accept-Encoding, Authorization",
+        }
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+        return headers
+
+class FeedSnapshot:
+    """A feed page rendered to bytes, refreshed in the background when stale"""
+    
+    def __init__(self, name: str, render: Callable[[], List[dict]], max_age_seconds: float):
+        self.render = render
+        self.max_age_seconds = max_age_seconds
+        self.current: Optional[Snapshot] = None
+        self.stale = True
+        self.refreshing = False
+        self.lock = threading.Lock()
+        self.worker = BackgroundWorker(name)
+    
+    def get(self) -> Snapshot:
+        """Current snapshot, scheduling a refresh if it is stale; renders inline only on a cold start"""
+        current = self.current
+        if current is None:
+            return self.refresh()
+        if self.stale or time.monotonic() - current.built_at > self.max_age_seconds:
+            self.schedule_refresh()
+        return current
+    
+    def invalidate(self, post_ids: Optional[set] = None):
+        """Mark the snapshot stale if it shows any of `post_ids` (or always, without ids)"""
+        current = self.current
+        if current is not None and post_ids is not None and current.post_ids.isdisjoint(post_ids):
+            return
+        self.stale = True
+        self.schedule_refresh()
+    
+    def schedule_refresh(self):
+        """Queue one background re-render; further requests coalesce into it"""
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        self.worker.submit(self._refresh_until_fresh)
+    
+    def refresh(self) -> Snapshot:
+        """Render and publish a new snapshot"""
+        # Cleared first, so an invalidation during the render marks the result stale
+        self.stale = False
+        items = self.render()
+        body = json.dumps(items, separators=(",", ":")).encode()
+        snapshot = Snapshot(
+            body=body,
+            gzipped=gzip.compress(body),
+            etag=make_etag(body),
+            built_at=time.monotonic(),
+            post_ids=frozenset(item["id"] for item in items)
+        )
+        self.current = snapshot
+        return snapshot
+    
+    def _refresh_until_fresh(self):
+        try:
+            while True:
+                self.refresh()
+                with self.lock:
+                    if not self.stale:
+                        self.refreshing = False
+                        return
+        except Exception:
+            with self.lock:
+                self.refreshing = False
+            raise
+
+def render_sample_posts() -> List[dict]:
+    """The newest posts as anonymous visitors see them, JSON-ready"""
+    db = SessionLocal()
+    try:
+        posts = db.query(Post).options(joinedload(Post.author)).order_by(desc(Post.created_at), desc(Post.id)).limit(SAMPLE_SIZE).all()
+        return [post.model_dump(mode="json") for post in build_post_responses(db, posts, include_details=True)]
+    finally:
+        db.close()
+
+# Global anonymous sample feed snapshot
+sample_snapshot = FeedSnapshot(
+    "sample-snapshot", render_sample_posts, max_age_seconds=settings.sample_snapshot_max_age_seconds
+)
+
+@subscribe
+def invalidate_sample_snapshot(events: List[PostEvent]):
+    """New or deleted posts shift the page; other writes only matter for posts on it"""
+    if any(event.kind in (POST_CREATED, POST_DELETED) for event in events):
+        sample_snapshot.invalidate()
+    else:
+        sample_snapshot.invalidate({event.post_id for event in events})
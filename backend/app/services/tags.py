@@ -0,0 +1,148 @@
+"""
+Hashtag and @mention inverted indexes.
+
+After a post or comment commits, its text is parsed on the background worker.
+`#tags` of a post and of its comments go into `post_tags`, one row per tag
+and post, so a tag page lists every post whose thread uses the tag. Any
+comment write recomputes the tags of its post. `@username` mentions in posts
+and comments go into `mentions`. Each row copies the created_at of its
+source, so tag pages and mentions timelines are keyset range scans over an
+index rather than content scans. Re-index everything with:
+
+    python -m app.services.tags
+"""
+import re
+from typing import List, Optional, Set
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.database import Comment, Mention, Post, PostTag, User
+from app.services.events import (
+    PostEvent, subscribe, POST_CREATED, POST_UPDATED, POST_DELETED,
+    COMMENT_CREATED, COMMENT_UPDATED, COMMENT_DELETED
+)
+from app.services.worker import background_worker
+
+TAG_PATTERN = re.compile(r"(?<![\w#])#(\w{1,100})")
+MENTION_PATTERN = re.compile(r"(?<![\w@])@(\w{1,50})")
+
+def extract_tags(content: str) -> Set[str]:
+    """Lowercased hashtags in `content`, without the '#'"""
+    return {tag.lower() for tag in TAG_PATTERN.findall(content or "")}
+
+def extract_mentions(content: str) -> Set[str]:
+    """Usernames mentioned in `content`, without the '@'"""
+    return set(MENTION_PATTERN.findall(content or ""))
+
+def normalize_tag(tag: str) -> str:
+    return tag.lstrip("#").lower()
+
+def _write_mentions(
+    db: Session,
+    content: str,
+    author_id: int,
+    post_id: int,
+    comment_id: Optional[int],
+    created_at
+):
+    """Insert mention rows for the users named in `content`, except the author"""
+    usernames = extract_mentions(content)
+    if not usernames:
+        return
+    user_ids = [row.id for row in db.query(User.id).filter(User.username.in_(usernames))]
+    db.bulk_insert_mappings(Mention, [
+        {
+            "user_id": user_id, "post_id": post_id, "comment_id": comment_id,
+            "author_id": author_id, "created_at": created_at
+        }
+        for user_id in user_ids if user_id != author_id
+    ])
+
+def _write_tags(db: Session, post_id: int, post_content: str, created_at):
+    """Insert tag rows for the hashtags of a post and of its comments"""
+    tags = extract_tags(post_content)
+    tagged_comments = db.query(Comment.content).filter(
+        Comment.post_id == post_id, Comment.content.contains("#")
+    )
+    for comment in tagged_comments:
+        tags |= extract_tags(comment.content)
+    db.bulk_insert_mappings(PostTag, [
+        {"tag": tag, "post_id": post_id, "created_at": created_at} for tag in tags
+    ])
+
+def index_post(post_id: int):
+    """Rewrite the tag and post-level mention rows of a post from its current content"""
+    db = SessionLocal()
+    try:
+        db.query(PostTag).filter(PostTag.post_id == post_id).delete(synchronize_session=False)
+        db.query(Mention).filter(
+            Mention.post_id == post_id, Mention.comment_id.is_(None)
+        ).delete(synchronize_session=False)
+        
+        post = db.query(Post.id, Post.content, Post.author_id, Post.created_at).filter(Post.id == post_id).first()
+        if post:
+            _write_tags(db, post.id, post.content, post.created_at)
+            _write_mentions(db, post.content, post.author_id, post.id, None, post.created_at)
+        db.commit()
+    finally:
+        db.close()
+
+def index_comment(comment_id: int, post_id: int):
+    """Rewrite the mention rows of a comment and the tag rows of its post"""
+    db = SessionLocal()
+    try:
+        db.query(Mention).filter(Mention.comment_id == comment_id).delete(synchronize_session=False)
+        comment = db.query(
+            Comment.id, Comment.content, Comment.author_id, Comment.post_id, Comment.created_at
+        ).filter(Comment.id == comment_id).first()
+        if comment:
+            _write_mentions(db, comment.content, comment.author_id, comment.post_id, comment.id, comment.created_at)
+        
+        db.query(PostTag).filter(PostTag.post_id == post_id).delete(synchronize_session=False)
+        post = db.query(Post.content, Post.created_at).filter(Post.id == post_id).first()
+        if post:
+            _write_tags(db, post_id, post.content, post.created_at)
+        db.commit()
+    finally:
+        db.close()
+
+def remove_post(post_id: int):
+    """Drop every tag and mention row of a deleted post, including its comments' mentions"""
+    db = SessionLocal()
+    try:
+        db.query(PostTag).filter(PostTag.post_id == post_id).delete(synchronize_session=False)
+        db.query(Mention).filter(Mention.post_id == post_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+@subscribe
+def schedule_indexing(events: List[PostEvent]):
+    """Parse committed posts and comments on the background worker"""
+    for event in events:
+        if event.kind in (POST_CREATED, POST_UPDATED):
+            background_worker.submit(index_post, event.post_id)
+        elif event.kind == POST_DELETED:
+            background_worker.submit(remove_post, event.post_id)
+        elif event.kind in (COMMENT_CREATED, COMMENT_UPDATED, COMMENT_DELETED) and event.comment_id:
+            # Re-indexing a deleted comment just removes its rows
+            background_worker.submit(index_comment, event.comment_id, event.post_id)
+
+def reindex_all(db: Session):
+    """Rebuild both indexes from every post and comment"""
+    db.query(PostTag).delete(synchronize_session=False)
+    db.query(Mention).delete(synchronize_session=False)
+    for post in db.query(Post.id, Post.content, Post.author_id, Post.created_at).all():
+        _write_tags(db, post.id, post.content, post.created_at)
+        _write_mentions(db, post.content, post.author_id, post.id, None, post.created_at)
+    comments = db.query(Comment.id, Comment.content, Comment.author_id, Comment.post_id, Comment.created_at)
+    for comment in comments.all():
+        _write_mentions(db, comment.content, comment.author_id, comment.post_id, comment.id, comment.created_at)
+    db.commit()
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        reindex_all(db)
+        print("Hashtag and mention indexes rebuilt successfully!")
+    finally:
+        db.close()
@@ -0,0 +1,128 @@
+"""
+Materialized home timelines, filled by fan-out on write.
+
+When a post is created its id is copied into the timeline of every follower
+(users with a friendship row pointing at the author) in batches on the
+background worker. Authors with more followers than
+`timeline_fanout_max_followers` are flagged `fanout_on_read` instead and
+their posts are merged into followers' pages at read time.
+
+Backfill existing posts into timelines with:
+
+    python -m app.services.timeline
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.pagination import encode_cursor, paginate_keyset
+from app.models.database import Post, TimelineEntry, User, friendship_table
+from app.services.user_cache import user_cache
+
+def fan_out_post(post_id: int):
+    """Copy a post into its author's and its followers' home timelines"""
+    db = SessionLocal()
+    try:
+        post = db.query(Post.id, Post.author_id, Post.created_at).filter(Post.id == post_id).first()
+        if not post:
+            return
+        
+        followers_count = db.query(func.count()).select_from(friendship_table).filter(
+            friendship_table.c.friend_id == post.author_id
+        ).scalar()
+        fanout_on_read = followers_count > settings.timeline_fanout_max_followers
+        # A bulk update skips the ORM events that invalidate cached users
+        flag_changed = db.query(User).filter(
+            User.id == post.author_id, User.fanout_on_read != fanout_on_read
+        ).update({User.fanout_on_read: fanout_on_read}, synchronize_session=False)
+        
+        # The author always sees their own posts
+        _insert_entries(db, [post.author_id], post)
+        db.commit()
+        if flag_changed:
+            user_cache.invalidate(post.author_id)
+        
+        if fanout_on_read:
+            return
+        
+        # Walk the followers in id order, one batch per transaction
+        last_follower_id = 0
+        while True:
+            follower_ids = [row.user_id for row in db.query(friendship_table.c.user_id).filter(
+                friendship_table.c.friend_id == post.author_id,
+                friendship_table.c.user_id > last_follower_id
+            ).order_by(friendship_table.c.user_id).limit(settings.timeline_fanout_batch_size)]
+            if not follower_ids:
+                break
+            _insert_entries(db, follower_ids, post)
+            db.commit()
+            last_follower_id = follower_ids[-1]
+    finally:
+        db.close()
+
+def _insert_entries(db: Session, user_ids: List[int], post):
+    db.execute(
+        TimelineEntry.__table__.insert().prefix_with("OR IGNORE", dialect="sqlite"),
+        [{"user_id": user_id, "post_id": post.id, "created_at": post.created_at} for user_id in user_ids]
+    )
+
+def get_home_timeline(
+    db: Session,
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 10
+) -> Tuple[List[int], Optional[str]]:
+    """
+    Return one page of post ids from a user's home timeline, newest first.
+    
+    The materialized timeline is a range scan on (user_id, created_at); posts
+    of followed fan-out-on-read authors are pulled and merged in.
+    """
+    entries, entries_cursor = paginate_keyset(
+        db.query(TimelineEntry.post_id, TimelineEntry.created_at).filter(
+            TimelineEntry.user_id == user_id
+        ),
+        TimelineEntry.created_at, TimelineEntry.post_id, cursor=cursor, limit=limit
+    )
+    candidates = {entry.post_id: entry.created_at for entry in entries}
+    has_more = entries_cursor is not None
+    
+    pull_author_ids = [row.id for row in db.query(User.id).join(
+        friendship_table, friendship_table.c.friend_id == User.id
+    ).filter(
+        friendship_table.c.user_id == user_id,
+        User.fanout_on_read.is_(True)
+    )]
+    if pull_author_ids:
+        pulled, pulled_cursor = paginate_keyset(
+            db.query(Post.id, Post.created_at).filter(Post.author_id.in_(pull_author_ids)),
+            Post.created_at, Post.id, cursor=cursor, limit=limit
+        )
+        candidates.update({post.id: post.created_at for post in pulled})
+        has_more = has_more or pulled_cursor is not None
+    
+    ordered = sorted(candidates.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    has_more = has_more or len(ordered) > limit
+    page = ordered[:limit]
+    
+    next_cursor = None
+    if has_more and page:
+        last_post_id, last_created_at = page[-1]
+        next_cursor = encode_cursor(last_created_at, last_post_id)
+    
+    return [post_id for post_id, _ in page], next_cursor
+
+def remove_post_from_timelines(db: Session, post_id: int):
+    """Delete a post's timeline entries (in the caller's transaction)"""
+    db.query(TimelineEntry).filter(TimelineEntry.post_id == post_id).delete(synchronize_session=False)
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        post_ids = [row.id for row in db.query(Post.id).order_by(Post.id)]
+    finally:
+        db.close()
+    for post_id in post_ids:
+        fan_out_post(post_id)
+    print(f"Fanned out {len(post_ids)} posts to home timelines")
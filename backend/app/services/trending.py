@@ -0,0 +1,232 @@
+"""
+Trending posts and hashtags from time-decayed engagement.
+
+Post events feed in-memory heavy-hitter trackers. Each tracker pairs a
+count-min sketch, which estimates the score of any key in fixed memory, with
+a top-K heap of the best keys seen so far. Decay is exponential with a
+configurable half-life. Instead of aging every counter, each new increment
+is weighted by a factor that grows over time, and the sketch is rescaled
+before that factor overflows. Raw sketch values therefore stay comparable at
+any instant, and reads are a dictionary sort with no database access.
+
+Tracker state is saved to `trending_snapshot_path` on the background worker
+every `trending_snapshot_interval_seconds` and at shutdown, and reloaded on
+startup.
+"""
+import hashlib
+import heapq
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.database import Comment, Post
+from app.services.events import (
+    PostEvent, subscribe, POST_CREATED, POST_DELETED, COMMENT_CREATED, REACTION_ADDED
+)
+from app.services.tags import extract_tags
+from app.services.worker import background_worker
+
+# Engagement weight of each event kind; switching or taking back a reaction adds none
+EVENT_WEIGHTS = {POST_CREATED: 1.0, REACTION_ADDED: 1.0, COMMENT_CREATED: 2.0}
+
+# Rescale the sketch before increment weights lose float precision
+MAX_WEIGHT = 1e12
+# Past this exponent exp() overflows; anything that old has decayed to nothing
+MAX_EXPONENT = 700.0
+
+class DecayingCountMin:
+    """Count-min sketch of exponentially decayed sums"""
+    
+    def __init__(self, width: int, depth: int, half_life_seconds: float):
+        self.width = width
+        self.depth = depth
+        self.rate = math.log(2) / half_life_seconds
+        self.table = np.zeros((depth, width), dtype=np.float64)
+        self.origin = time.time()
+        self.rows = np.arange(depth)
+    
+    def weight(self, now: float) -> float:
+        """Multiplier of an increment made at `now`, relative to the origin"""
+        return math.exp(min(self.rate * (now - self.origin), MAX_EXPONENT))
+    
+    def decay(self, now: float) -> float:
+        """Converts raw values to scores as of `now`"""
+        return math.exp(-self.rate * (now - self.origin))
+    
+    def columns(self, key: str) -> np.ndarray:
+        # Stable across processes, unlike hash(), so snapshots stay valid
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint32) % self.width
+    
+    def add(self, key: str, amount: float, now: float) -> float:
+        """Add a decayed increment and return the key's new raw estimate"""
+        columns = self.columns(key)
+        self.table[self.rows, columns] += amount * self.weight(now)
+        return float(self.table[self.rows, columns].min())
+    
+    def rescale(self, now: float) -> float:
+        """Move the origin to `now`; returns the factor raw values were divided by"""
+        factor = self.weight(now)
+        self.table /= factor
+        self.origin = now
+        return factor
+
+class TopK:
+    """The K keys with the highest raw scores, as a dict plus a lazily pruned min-heap"""
+    
+    def __init__(self, k: int):
+        self.k = k
+        self.scores: Dict[str, float] = {}
+        self.heap: List[Tuple[float, str]] = []
+    
+    def offer(self, key: str, raw: float):
+        if key in self.scores or len(self.scores) < self.k:
+            self.scores[key] = raw
+            heapq.heappush(self.heap, (raw, key))
+        else:
+            self._prune()
+            lowest_raw, lowest_key = self.heap[0]
+            if raw <= lowest_raw:
+                return
+            heapq.heappop(self.heap)
+            del self.scores[lowest_key]
+            self.scores[key] = raw
+            heapq.heappush(self.heap, (raw, key))
+        if len(self.heap) > 4 * self.k:
+            self._rebuild()
+    
+    def discard(self, key: str):
+        if self.scores.pop(key, None) is not None:
+            self._rebuild()
+    
+    def scale(self, factor: float):
+        self.scores = {key: raw / factor for key, raw in self.scores.items()}
+        self._rebuild()
+    
+    def _prune(self):
+        """Drop heap entries that no longer match a key's current score"""
+        while self.heap and self.scores.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+    
+    def _rebuild(self):
+        self.heap = [(raw, key) for key, raw in self.scores.items()]
+        heapq.heapify(self.heap)
+
+class TrendingTracker:
+    """Bounded-memory tracker of the highest decayed scores among any number of keys"""
+    
+    def __init__(self, width: int, depth: int, k: int, half_life_seconds: float):
+        self.sketch = DecayingCountMin(width, depth, half_life_seconds)
+        self.top = TopK(k)
+        self.lock = threading.Lock()
+    
+    def record(self, key: str, amount: float, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self.lock:
+            if self.sketch.weight(now) > MAX_WEIGHT:
+                self.top.scale(self.sketch.rescale(now))
+            self.top.offer(key, self.sketch.add(key, amount, now))
+    
+    def discard(self, key: str):
+        with self.lock:
+            self.top.discard(key)
+    
+    def leaders(self, limit: int, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Top keys with their scores decayed to `now`, best first"""
+        now = time.time() if now is None else now
+        with self.lock:
+            decay = self.sketch.decay(now)
+            ranked = sorted(self.top.scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(key, raw * decay) for key, raw in ranked]
+    
+    def state(self, prefix: str) -> Dict[str, np.ndarray]:
+        with self.lock:
+            keys = list(self.top.scores)
+            return {
+                f"{prefix}_table": self.sketch.table.copy(),
+                f"{prefix}_origin": np.array(self.sketch.origin),
+                f"{prefix}_keys": np.array(keys, dtype=str),
+                f"{prefix}_raws": np.array([self.top.scores[key] for key in keys], dtype=np.float64),
+            }
+    
+    def restore(self, prefix: str, state) -> bool:
+        table = state[f"{prefix}_table"]
+        if table.shape != self.sketch.table.shape:
+            return False
+        with self.lock:
+            self.sketch.table = table.astype(np.float64)
+            self.sketch.origin = float(state[f"{prefix}_origin"])
+            self.top.scores = dict(zip(state[f"{prefix}_keys"].tolist(), state[f"{prefix}_raws"].tolist()))
+            self.top._rebuild()
+        return True
+
+def _new_tracker() -> TrendingTracker:
+    return TrendingTracker(
+        width=settings.trending_sketch_width,
+        depth=settings.trending_sketch_depth,
+        k=settings.trending_top_k,
+        half_life_seconds=settings.trending_half_life_seconds
+    )
+
+# Global trending trackers
+trending_posts = _new_tracker()
+trending_tags = _new_tracker()
+
+_last_snapshot = time.monotonic()
+
+def save_snapshot(path: str = settings.trending_snapshot_path):
+    """Write both trackers to `path` atomically"""
+    state = {**trending_posts.state("posts"), **trending_tags.state("tags")}
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as snapshot_file:
+        np.savez(snapshot_file, **state)
+    os.replace(temporary, path)
+
+def load_snapshot(path: str = settings.trending_snapshot_path):
+    """Restore both trackers from `path`, if a compatible snapshot exists"""
+    if not os.path.exists(path):
+        return
+    try:
+        with np.load(path) as state:
+            if not (trending_posts.restore("posts", state) and trending_tags.restore("tags", state)):
+                print("Trending snapshot does not match the sketch settings; starting empty")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not load trending snapshot: {e}")
+
+def _record_tags(post_id: Optional[int], comment_id: Optional[int], amount: float):
+    """Credit the hashtags of a new post or comment, loaded by primary key"""
+    db = SessionLocal()
+    try:
+        if comment_id is not None:
+            content = db.query(Comment.content).filter(Comment.id == comment_id).scalar()
+        else:
+            content = db.query(Post.content).filter(Post.id == post_id).scalar()
+    finally:
+        db.close()
+    for tag in extract_tags(content):
+        trending_tags.record(tag, amount)
+
+@subscribe
+def record_engagement(events: List[PostEvent]):
+    """Feed committed post events into the trackers"""
+    global _last_snapshot
+    for event in events:
+        if event.kind == POST_DELETED:
+            trending_posts.discard(str(event.post_id))
+            continue
+        amount = EVENT_WEIGHTS.get(event.kind)
+        if amount is None:
+            continue
+        trending_posts.record(str(event.post_id), amount)
+        if event.kind == POST_CREATED:
+            background_worker.submit(_record_tags, event.post_id, None, amount)
+        elif event.kind == COMMENT_CREATED:
+            background_worker.submit(_record_tags, event.post_id, event.comment_id, amount)
+    
+    if time.monotonic() - _last_snapshot > settings.trending_snapshot_interval_seconds:
+        _last_snapshot = time.monotonic()
+        background_worker.submit(save_snapshot)
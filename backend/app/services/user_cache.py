@@ -0,0 +1,91 @@
+"""
+In-process cache of authenticated users.
+
+Every authenticated request resolves the user id in its access token to a
+user. Resolved users are kept here as plain column snapshots, keyed by id,
+for a short TTL and with LRU eviction. On a hit the snapshot is attached to
+the request's session without a query. Updates and deletes of users flushed
+through the ORM, which include deactivation and deletion, invalidate the
+user's entry on commit. Bulk `query(User).update()` statements bypass those
+events, so paths using them, and profile edits, call `invalidate` after
+committing.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core.config import settings
+from app.models.database import User
+
+USER_COLUMNS = [column.key for column in User.__table__.columns]
+
+class UserCache:
+    """LRU + TTL cache of user column snapshots keyed by user id"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped by every invalidation, so users loaded concurrently are not stored stale
+        self.generation = 0
+    
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at <= time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return values
+    
+    def put(self, user: User, generation: int):
+        """Store a snapshot of `user`, unless it was invalidated since `generation`"""
+        values = {key: getattr(user, key) for key in USER_COLUMNS}
+        with self.lock:
+            if generation != self.generation or self.max_entries <= 0:
+                return
+            self.entries.pop(user.id, None)
+            self.entries[user.id] = (time.monotonic() + self.ttl_seconds, values)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def invalidate(self, user_id: int):
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(user_id, None)
+    
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+# Global authenticated-user cache instance
+user_cache = UserCache(settings.user_cache_max_entries, settings.user_cache_ttl_seconds)
+
+def attach_cached_user(db: Session, values: Dict[str, Any]) -> User:
+    """Add a cached snapshot to `db` as a persistent user, without querying"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _track_changed_user(mapper, connection, user: User):
+    session = Session.object_session(user)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(user.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session: Session):
+    session.info.pop("changed_user_ids", None)
@@ -0,0 +1,73 @@
+"""
+Change tokens for conditional GETs.
+
+Endpoints hash what their response depends on into an ETag and answer a
+matching If-None-Match with 304 before building the response. Feed pages
+depend on their post ids and each post's last `change_log` id, which every
+post, comment and reaction write appends, so a write only changes the pages
+that show its post. Profile edits and each user's conversations are
+counted in `resource_versions`, bumped in the same transaction as the
+write. Presence is not counted there, since connects and disconnects would
+make that row the hottest in the database. Responses that show presence
+hash the users' `is_online` and `last_seen` instead.
+"""
+import hashlib
+from typing import Dict, List, Sequence
+from fastapi import Request, Response, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.database import dialect_insert
+from app.models.database import PostChange, ResourceVersion
+
+PROFILES = "profiles"
+
+def chats_resource(user_id: int) -> str:
+    """Name of the resource set covering a user's conversations"""
+    return f"chats:{user_id}"
+
+def bump_version(db: Session, *names: str):
+    """Advance the write sequence of each named resource set (in the caller's transaction)"""
+    for name in names:
+        # One upsert, so two first writers cannot both insert the row
+        statement = dialect_insert(db)(ResourceVersion).values(name=name, version=1)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[ResourceVersion.name],
+            set_={"version": ResourceVersion.version + 1}
+        ))
+
+def get_versions(db: Session, *names: str) -> Dict[str, int]:
+    """Current write sequence of each named resource set (0 if never written)"""
+    versions = dict(
+        db.query(ResourceVersion.name, ResourceVersion.version).filter(ResourceVersion.name.in_(names))
+    )
+    return {name: versions.get(name, 0) for name in names}
+
+def feed_etag(db: Session, post_ids: Sequence[int], profiles_version: int, *parts) -> str:
+    """ETag of a feed page: its posts in order, their last changes and the `PROFILES` version it shows"""
+    last_changes = dict(db.query(PostChange.post_id, func.max(PostChange.id)).filter(
+        PostChange.post_id.in_(post_ids)
+    ).group_by(PostChange.post_id))
+    return make_etag(
+        "feed", list(post_ids), [last_changes.get(post_id) for post_id in post_ids],
+        profiles_version, *parts
+    )
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the values a response depends on"""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names `etag`"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates: List[str] = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # Clients may reuse a stored copy, but must revalidate it first
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
@@ -4,6 +4,8 @@ from sqlalchemy.orm import Session
 from app.models.database import User, Message
 from app.models.schemas import WebSocketMessage, MessageResponse
 from app.core.database import get_db
+from app.services.chats import mark_chat_read
+from app.services.versions import bump_version, chats_resource
 import json
 from datetime import datetime
 
@@ -80,6 +82,7 @@ class WebSocketManager:
                 receiver_id=receiver_id
             )
             db.add(db_message)
+            bump_version(db, chats_resource(sender_id), chats_resource(receiver_id))
             db.commit()
             db.refresh(db_message)
             
@@ -165,11 +168,7 @@ class WebSocketManager:
         db = next(get_db())
         try:
             # Mark messages from other_user to user as read
-            db.query(Message).filter(
-                Message.sender_id == other_user_id,
-                Message.receiver_id == user_id,
-                Message.is_read == False
-            ).update({"is_read": True})
+            mark_chat_read(db, user_id, other_user_id)
             db.commit()
             
             # Notify sender about read status
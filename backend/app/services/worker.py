@@ -0,0 +1,57 @@
+"""
+In-process background worker for work that should run off the request path.
+"""
+import queue
+import threading
+import time
+from typing import Callable
+
+class BackgroundWorker:
+    """Runs submitted jobs one at a time, in order, on a daemon thread"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.jobs: "queue.Queue" = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+    
+    def submit(self, func: Callable, *args, **kwargs):
+        """Queue `func(*args, **kwargs)` to run on the worker thread"""
+        self.jobs.put((func, args, kwargs))
+        self._ensure_started()
+    
+    def every(self, seconds: float, func: Callable, *args, **kwargs):
+        """Submit `func(*args, **kwargs)` now and then every `seconds`, from a daemon timer thread"""
+        def tick():
+            while True:
+                self.submit(func, *args, **kwargs)
+                time.sleep(seconds)
+        
+        threading.Thread(target=tick, name=f"{self.name}-timer", daemon=True).start()
+    
+    def pending(self) -> int:
+        """Number of jobs waiting to run"""
+        return self.jobs.qsize()
+    
+    def join(self):
+        """Block until every queued job has run"""
+        self.jobs.join()
+    
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+    
+    def _run(self):
+        while True:
+            func, args, kwargs = self.jobs.get()
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"Background job {getattr(func, '__name__', func)} failed: {e}")
+            finally:
+                self.jobs.task_done()
+
+# Global background worker instance
+background_worker = BackgroundWorker("background-worker")
@@ -0,0 +1,98 @@
+"""
+Like toggle latency on posts with 1k, 10k and 100k existing likes.
+
+Toggles a like on and off against a scratch SQLite database and counts the
+SQL statements each toggle issues, change log write included. A toggle must cost the same on a viral
+post as on a quiet one. The run fails if the statement count changes with
+popularity, or if latency grows past MAX_SLOWDOWN. Run from backend/:
+
+    python -m benchmarks.likes
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models.database import Base, Post, PostReaction, User
+# Registers the in-transaction change log write every toggle commits with
+import app.services.changes
+from app.services.reactions import LIKE, toggle_like
+
+LIKE_COUNTS = (1_000, 10_000, 100_000)
+REPEATS = 50
+MAX_SLOWDOWN = 3.0
+
+def seed_post(session_factory, likes: int) -> int:
+    """Create a post liked by `likes` users and return its id"""
+    db = session_factory()
+    try:
+        author = User(
+            username=f"author{likes}", email=f"author{likes}@example.com",
+            full_name="Benchmark Author", hashed_password="x"
+        )
+        db.add(author)
+        db.flush()
+        post = Post(
+            content="benchmark", author_id=author.id,
+            likes_count=likes, reaction_counts={LIKE: likes}
+        )
+        db.add(post)
+        db.flush()
+        db.execute(
+            PostReaction.__table__.insert(),
+            [{"user_id": user_id, "post_id": post.id, "reaction_type": LIKE} for user_id in range(1, likes + 1)]
+        )
+        db.commit()
+        return post.id
+    finally:
+        db.close()
+
+def time_toggle(session_factory, post_id: int, user_id: int) -> float:
+    """Median milliseconds of one committed toggle"""
+    timings = []
+    for _ in range(REPEATS):
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            toggle_like(db, post_id, user_id)
+            db.commit()
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            db.close()
+    return statistics.median(timings)
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'likes.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        
+        statements = []
+        
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_statement(connection, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        results = []
+        print(f"{'likes':>8}  {'toggle ms':>10}  {'statements':>10}")
+        for likes in LIKE_COUNTS:
+            post_id = seed_post(session_factory, likes)
+            statements.clear()
+            median_ms = time_toggle(session_factory, post_id, user_id=likes + 1)
+            per_toggle = len(statements) // REPEATS
+            results.append((likes, median_ms, per_toggle))
+            print(f"{likes:>8}  {median_ms:>10.3f}  {per_toggle:>10}")
+        engine.dispose()
+    
+    fastest = min(median_ms for _, median_ms, _ in results)
+    slowest = max(median_ms for _, median_ms, _ in results)
+    if len({per_toggle for _, _, per_toggle in results}) != 1:
+        sys.exit("FAIL: statements per toggle depend on the number of likes")
+    if slowest > fastest * MAX_SLOWDOWN:
+        sys.exit(f"FAIL: toggle latency grew {slowest / fastest:.1f}x with popularity")
+    print("OK: toggle cost is independent of popularity")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Per-request feed ranking latency at 1k, 10k and 100k candidates.
+
+Times what a ranked feed request does after its queries return: building the
+candidate arrays from rows and scoring/sorting them. Run from backend/:
+
+    python -m benchmarks.ranking
+"""
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from app.services.ranking import REACTION_TYPES, Affinity, EngagementRanker, build_candidate_batch
+
+CANDIDATE_COUNTS = (1_000, 10_000, 100_000)
+REPEATS = 7
+
+def make_rows(count: int, rng: random.Random):
+    """Synthetic rows shaped like the candidate query's result"""
+    now = datetime.utcnow()
+    return [
+        (
+            post_id,
+            rng.randrange(1, 5_000),
+            now - timedelta(seconds=rng.randrange(0, 7 * 24 * 3600)),
+            rng.randrange(0, 500),
+            rng.randrange(0, 200),
+            {reaction_type: rng.randrange(0, 300) for reaction_type in rng.sample(REACTION_TYPES, 3)}
+        )
+        for post_id in range(1, count + 1)
+    ]
+
+def make_affinity(rng: random.Random) -> Affinity:
+    author_ids = np.array(sorted(rng.sample(range(1, 5_000), 300)), dtype=np.int64)
+    return Affinity(author_ids, np.array([rng.uniform(0.5, 4.0) for _ in author_ids]))
+
+def time_ms(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    rng = random.Random(42)
+    ranker = EngagementRanker()
+    affinity = make_affinity(rng)
+    
+    print(f"{'candidates':>10}  {'build ms':>9}  {'rank ms':>8}  {'total ms':>9}")
+    for count in CANDIDATE_COUNTS:
+        rows = make_rows(count, rng)
+        build_times, rank_times = [], []
+        for _ in range(REPEATS):
+            batch_holder = {}
+            build_times.append(time_ms(lambda: batch_holder.update(batch=build_candidate_batch(rows))))
+            rank_times.append(time_ms(lambda: ranker.rank(batch_holder["batch"], affinity)))
+        build_ms = statistics.median(build_times)
+        rank_ms = statistics.median(rank_times)
+        print(f"{count:>10}  {build_ms:>9.2f}  {rank_ms:>8.2f}  {build_ms + rank_ms:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 from app.core.config import settings
-from app.core.database import create_tables
-from app.api import auth, posts, websocket, stories, messages
+from app.core.database import create_tables, engine, SessionLocal
+from app.api import auth, posts, websocket, stories, messages, batch, search, tags, trending
 from app.services.init_data import init_sample_data, init_sample_stories
+from app.services.changes import start_change_log_pruning
+from app.services.counters import rebuild_counters
+from app.services.search import create_search_index
+from app.services.snapshots import sample_snapshot
+from app.services import trending as trending_service
+from app.services.sessions import hash_stored_refresh_tokens, session_registry, start_refresh_token_purge
 
 # Create FastAPI app
 app = FastAPI(
@@ -27,6 +33,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Create upload directory if it doesn't exist
@@ -40,16 +47,48 @@ app.include_router(auth.router, prefix="/api")
 app.include_router(posts.router, prefix="/api")
 app.include_router(stories.router, prefix="/api")
 app.include_router(messages.router, prefix="/api")
+app.include_router(batch.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(tags.router, prefix="/api")
+app.include_router(tags.mentions_router, prefix="/api")
+app.include_router(trending.router, prefix="/api")
 app.include_router(websocket.router)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
-    create_tables()
+    schema_changes = create_tables()
+    # Full-text search runs on SQLite FTS5
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            create_search_index(connection)
+    # Rebuild counters when an upgrade added them or changed the rows they count
+    if schema_changes:
+        db = SessionLocal()
+        try:
+            rebuild_counters(db)
+        finally:
+            db.close()
+    # Load revoked session generations before serving any request
+    session_registry.refresh()
+    # Refresh tokens from before digests were stored, then sweep expired ones periodically
+    hash_stored_refresh_tokens()
+    start_refresh_token_purge()
+    # Drop change log entries past retention periodically
+    start_change_log_pruning()
     # Initialize sample data
     await init_sample_data()
     # Initialize sample stories
     await init_sample_stories()
+    # Render the anonymous sample feed before the first visitor asks for it
+    sample_snapshot.schedule_refresh()
+    # Resume trending scores from the last snapshot
+    trending_service.load_snapshot()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist in-memory state on shutdown"""
+    trending_service.save_snapshot()
 
 @app.get("/")
 async def root():
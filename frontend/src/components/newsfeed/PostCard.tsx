@@ -210,7 +210,7 @@ const PostCard: React.FC<PostCardProps> = ({
             </div>
           </div>
           <div className="flex items-center space-x-4">
-            <span>{formatNumber(post.comments.length)} comments</span>
+            <span>{formatNumber(post.commentsCount ?? post.comments.length)} comments</span>
             <span>{formatNumber(post.shares)} shares</span>
           </div>
         </div>
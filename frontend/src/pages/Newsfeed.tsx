@@ -33,6 +33,7 @@ const Newsfeed: React.FC = () => {
       image: backendPost.image_url,
       timestamp: new Date(backendPost.created_at),
       likes: backendPost.likes_count || 0,
+      commentsCount: backendPost.comments_count || 0,
       shares: backendPost.shares_count || 0,
       isLiked: backendPost.is_liked || false,
       reaction: backendPost.current_user_reaction || undefined,
@@ -234,7 +235,8 @@ const Newsfeed: React.FC = () => {
           };
           return {
             ...post,
-            comments: [...post.comments, transformedComment]
+            comments: [...post.comments, transformedComment],
+            commentsCount: (post.commentsCount ?? post.comments.length) + 1
           };
         }
         return post;
@@ -332,7 +334,8 @@ const Newsfeed: React.FC = () => {
         if (post.id === postId) {
           return {
             ...post,
-            comments: post.comments.filter(comment => comment.id !== commentId)
+            comments: post.comments.filter(comment => comment.id !== commentId),
+            commentsCount: Math.max((post.commentsCount ?? post.comments.length) - 1, 0)
           };
         }
         return post;
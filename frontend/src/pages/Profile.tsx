@@ -172,6 +172,7 @@ const ProfilePage: React.FC = () => {
           image: post.image_url,
           timestamp: new Date(post.created_at),
           likes: post.likes_count || 0,
+          commentsCount: post.comments_count || 0,
           shares: post.shares_count || 0,
           isLiked: post.is_liked || false,
           reaction: post.current_user_reaction,
@@ -360,7 +361,8 @@ const ProfilePage: React.FC = () => {
         if (post.id === postId) {
           return {
             ...post,
-            comments: post.comments.filter(comment => comment.id !== commentId)
+            comments: post.comments.filter(comment => comment.id !== commentId),
+            commentsCount: Math.max((post.commentsCount ?? post.comments.length) - 1, 0)
           };
         }
         return post;
@@ -13,6 +13,7 @@ export interface Post {
   timestamp: Date;
   likes: number;
   comments: Comment[];
+  commentsCount?: number; // Total comments; `comments` only holds the latest few
   shares: number;
   isLiked?: boolean;
   reaction?: string; // Current user's reaction type